@@ -0,0 +1,356 @@
+""" Array-backed Binary Search Tree ADT.
+    Defines a Binary Search Tree with the same interface as bst.BinarySearchTree,
+    but with no node objects: node i is the i-th entry of parallel arrays holding
+    the keys, the items, the indices of the children and the subtree sizes.
+    Keys are stored unboxed in an array.array, so they must be numbers of the
+    array's typecode ('q' for integers by default, 'd' for floats).
+"""
+
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+from array import array
+from typing import TypeVar, Generic, Iterator, Iterable
+from operator import itemgetter, lt
+import sys
+
+
+# generic types
+K = TypeVar('K')
+I = TypeVar('I')
+
+NIL = -1  # index of a missing child
+
+
+class ArrayBinarySearchTree(Generic[K, I]):
+    """
+        Basic binary search tree over parallel arrays.
+        Children are int indices ('i', so at most 2**31 - 1 nodes), and the slots
+        of deleted nodes are kept on a free list, chained through their left index,
+        to be reused by the next insertions.
+        The methods that return a node in BinarySearchTree (select) return the
+        (key, item) pair here.
+    """
+
+    def __init__(self, typecode: str = 'q') -> None:
+        """
+            Initialises an empty tree whose keys have the given array typecode
+            :complexity: O(1)
+        """
+        self.typecode = typecode
+        self.keys_array = array(typecode)
+        self.items_list = []
+        self.left = array('i')
+        self.right = array('i')
+        self.subtree_size = array('i')
+        self.free = NIL
+        self.root = NIL
+        self.length = 0
+
+    @classmethod
+    def from_sorted(cls, pairs: Iterable[tuple[K, I]], typecode: str = 'q') -> ArrayBinarySearchTree[K, I]:
+        """
+            Builds a perfectly balanced tree from (key, item) pairs in increasing order of key.
+            The pair at position i goes in slot i, so the arrays are in key order.
+            :raises ValueError: if the keys are not strictly increasing
+            :complexity: O(N) where N is the number of pairs
+        """
+        tree = cls(typecode)
+        for key, item in pairs:
+            tree.keys_array.append(key)
+            tree.items_list.append(item)
+        keys = tree.keys_array
+        if not all(map(lt, keys, keys[1:])):
+            raise ValueError('Keys are not strictly increasing')
+
+        n = len(keys)
+        tree.left = array('i', [NIL]) * n
+        tree.right = array('i', [NIL]) * n
+        tree.subtree_size = array('i', [0]) * n
+
+        def build(lo: int, hi: int) -> int:
+            """ Links the subtree holding the slots lo to hi - 1, and returns its root. """
+            if lo >= hi:
+                return NIL
+            middle = (lo + hi) // 2
+            tree.left[middle] = build(lo, middle)
+            tree.right[middle] = build(middle + 1, hi)
+            tree.subtree_size[middle] = hi - lo
+            return middle
+
+        tree.root = build(0, n)
+        tree.length = n
+        return tree
+
+    @classmethod
+    def from_unsorted(cls, pairs: Iterable[tuple[K, I]], typecode: str = 'q') -> ArrayBinarySearchTree[K, I]:
+        """
+            Builds a perfectly balanced tree from (key, item) pairs in any order.
+            :raises ValueError: if a key is repeated
+            :complexity: O(N * log(N)) where N is the number of pairs, to sort them
+        """
+        return cls.from_sorted(sorted(pairs, key=itemgetter(0)), typecode)
+
+    def is_empty(self) -> bool:
+        """
+            Checks to see if the bst is empty
+            :complexity: O(1)
+        """
+        return self.root == NIL
+
+    def __len__(self) -> int:
+        """ Returns the number of nodes in the tree. """
+        return self.length
+
+    def __iter__(self) -> Iterator[K]:
+        """
+            Iterates over the keys in increasing order.
+            :complexity: O(N) for the whole iteration, with O(D) memory where D is the depth of the tree
+        """
+        return self.keys()
+
+    def __reversed__(self) -> Iterator[K]:
+        """ Iterates over the keys in decreasing order. """
+        keys = self.keys_array
+        return (keys[node] for node in self.iter_nodes(reverse=True))
+
+    def keys(self) -> Iterator[K]:
+        """ Iterates over the keys in increasing order. """
+        keys = self.keys_array
+        return (keys[node] for node in self.iter_nodes())
+
+    def items(self) -> Iterator[tuple[K, I]]:
+        """ Iterates over the (key, item) pairs in increasing order of key. """
+        keys, items = self.keys_array, self.items_list
+        return ((keys[node], items[node]) for node in self.iter_nodes())
+
+    def iter_nodes(self, reverse: bool = False) -> Iterator[int]:
+        """
+            Yields the slots of the nodes in order of key, increasing unless reverse is set.
+            The tree must not be changed while iterating.
+            :complexity: O(N) for the whole iteration, and O(D) for a single step
+        """
+        first, second = (self.right, self.left) if reverse else (self.left, self.right)
+        stack = []
+        current = self.root
+        while stack or current != NIL:
+            while current != NIL:
+                stack.append(current)
+                current = first[current]
+            current = stack.pop()
+            yield current
+            current = second[current]
+
+    def range(self, lo: K, hi: K | None = None) -> Iterator[tuple[K, I]]:
+        """
+            Yields the (key, item) pairs with lo <= key < hi, or lo <= key if hi is None,
+            in increasing order of key.
+            :complexity: O(D + M) where D is the depth of the tree and M the number of pairs yielded
+        """
+        keys, items, left, right = self.keys_array, self.items_list, self.left, self.right
+        stack = []
+        current = self.root
+        while stack or current != NIL:
+            while current != NIL:
+                if keys[current] < lo:  # all of the left subtree is below lo too
+                    current = right[current]
+                else:
+                    stack.append(current)
+                    current = left[current]
+            if not stack:  # every key left is below lo
+                return
+            current = stack.pop()
+            key = keys[current]
+            if hi is not None and not key < hi:
+                return
+            yield key, items[current]
+            current = right[current]
+
+    def __contains__(self, key: K) -> bool:
+        """
+            Checks to see if the key is in the BST
+            :complexity: see __getitem__(self, key: K) -> (K, I)
+        """
+        return self.find(key) != NIL
+
+    def __getitem__(self, key: K) -> I:
+        """
+            Attempts to get an item in the tree, it uses the Key to attempt to find it
+            :complexity best: O(1) finds the item in the root of the tree
+            :complexity worst: O(D) item is not found, where D is the depth of the tree
+        """
+        node = self.find(key)
+        if node == NIL:
+            raise KeyError('Key not found: {0}'.format(key))
+        return self.items_list[node]
+
+    def find(self, key: K) -> int:
+        """
+            Returns the slot of the node with the given key, or NIL if there is none.
+            :complexity: O(D) where D is the depth of the tree
+        """
+        keys, left, right = self.keys_array, self.left, self.right
+        current = self.root
+        while current != NIL:
+            current_key = keys[current]
+            if key == current_key:
+                return current
+            current = left[current] if key < current_key else right[current]
+        return NIL
+
+    def __setitem__(self, key: K, item: I) -> None:
+        """
+            Attempts to insert an item into the tree, it uses the Key to insert it
+            :raises ValueError: if the key is already in the tree
+            :complexity: O(D) where D is the depth of the tree
+        """
+        keys, left, right = self.keys_array, self.left, self.right
+        path = []
+        current = self.root
+        while current != NIL:
+            path.append(current)
+            current_key = keys[current]
+            if key < current_key:
+                current = left[current]
+            elif key > current_key:
+                current = right[current]
+            else:  # key == current_key
+                raise ValueError('Inserting duplicate item')
+
+        node = self.allocate(key, item)
+        if not path:
+            self.root = node
+        elif key < keys[path[-1]]:
+            left[path[-1]] = node
+        else:
+            right[path[-1]] = node
+        subtree_size = self.subtree_size
+        for ancestor in path:
+            subtree_size[ancestor] += 1
+        self.length += 1
+
+    def allocate(self, key: K, item: I) -> int:
+        """
+            Returns a slot holding a new leaf, reusing a freed slot if there is one.
+            :complexity: O(1) amortised
+        """
+        node = self.free
+        if node == NIL:
+            self.keys_array.append(key)
+            self.items_list.append(item)
+            self.left.append(NIL)
+            self.right.append(NIL)
+            self.subtree_size.append(1)
+            return len(self.keys_array) - 1
+        self.free = self.left[node]
+        self.keys_array[node] = key
+        self.items_list[node] = item
+        self.left[node] = NIL
+        self.right[node] = NIL
+        self.subtree_size[node] = 1
+        return node
+
+    def __delitem__(self, key: K) -> None:
+        """
+            Attempts to delete an item from the tree, it uses the Key to
+            determine the node to delete.
+            :raises ValueError: if the key is not in the tree
+            :complexity: O(D) where D is the depth of the tree
+        """
+        keys, left, right = self.keys_array, self.left, self.right
+        path = []
+        node = self.root
+        while node != NIL and key != keys[node]:
+            path.append(node)
+            node = left[node] if key < keys[node] else right[node]
+        if node == NIL:  # key not found
+            raise ValueError('Deleting non-existent item')
+
+        if left[node] != NIL and right[node] != NIL:
+            # general case => move the successor up, and delete its slot instead
+            path.append(node)
+            succ = right[node]
+            while left[succ] != NIL:
+                path.append(succ)
+                succ = left[succ]
+            keys[node] = keys[succ]
+            self.items_list[node] = self.items_list[succ]
+            node = succ
+
+        # node has at most one child, which takes its place
+        child = left[node] if left[node] != NIL else right[node]
+        if not path:
+            self.root = child
+        elif left[path[-1]] == node:
+            left[path[-1]] = child
+        else:
+            right[path[-1]] = child
+        subtree_size = self.subtree_size
+        for ancestor in path:
+            subtree_size[ancestor] -= 1
+        self.release(node)
+        self.length -= 1
+
+    def release(self, node: int) -> None:
+        """
+            Puts a slot on the free list, dropping its item.
+            :complexity: O(1)
+        """
+        self.items_list[node] = None
+        self.left[node] = self.free
+        self.free = node
+
+    def select(self, k: int) -> tuple[K, I] | None:
+        """
+        Finds the (key, item) pair with the kth smallest key in the tree, counting from 1,
+        or None if k is out of range.
+        :complexity: O(D) where D is the depth of the tree
+        """
+        left, right, subtree_size = self.left, self.right, self.subtree_size
+        current = self.root
+        while current != NIL:
+            left_size = 0 if left[current] == NIL else subtree_size[left[current]]
+            if k <= left_size:
+                current = left[current]
+            elif k == left_size + 1:
+                return self.keys_array[current], self.items_list[current]
+            else:
+                k -= left_size + 1
+                current = right[current]
+        return None
+
+    def rank(self, key: K) -> int:
+        """
+        Returns the number of keys in the tree smaller than key, which need not be in the tree.
+        :complexity: O(D) where D is the depth of the tree
+        """
+        keys, left, right, subtree_size = self.keys_array, self.left, self.right, self.subtree_size
+        rank = 0
+        current = self.root
+        while current != NIL:
+            left_size = 0 if left[current] == NIL else subtree_size[left[current]]
+            current_key = keys[current]
+            if key < current_key:
+                current = left[current]
+            elif key > current_key:
+                rank += left_size + 1
+                current = right[current]
+            else:  # key == current_key
+                return rank + left_size
+        return rank
+
+    def draw(self, to=sys.stdout):
+        """ Draw the tree in the terminal. """
+        self.draw_aux(self.root, prefix='', final='', to=to)
+
+    def draw_aux(self, current: int, prefix='', final='', to=sys.stdout) -> None:
+        """ Draw a node and then its children. """
+        real_prefix = prefix[:-2] + final
+        if current != NIL:
+            print('{0}{1}'.format(real_prefix, str(self.keys_array[current])), file=to)
+            if self.left[current] != NIL or self.right[current] != NIL:
+                self.draw_aux(self.left[current], prefix=prefix + '\u2551 ', final='\u255f\u2500', to=to)
+                self.draw_aux(self.right[current], prefix=prefix + '  ', final='\u2559\u2500', to=to)
+        else:
+            print('{0}'.format(real_prefix), file=to)
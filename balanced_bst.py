@@ -0,0 +1,128 @@
+""" Self-balancing Binary Search Tree ADT.
+    Defines a weight-balanced Binary Search Tree: every node keeps the sizes of
+    its two subtrees within a constant factor of each other, rotating on insert
+    and delete when they drift apart. Balance is judged from subtree_size alone,
+    so the nodes are the same as in the basic Binary Search Tree.
+"""
+
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+from typing import TypeVar
+from bst import BinarySearchTree
+from node import TreeNode
+
+
+# generic types
+K = TypeVar('K')
+I = TypeVar('I')
+
+
+def size(current: TreeNode | None) -> int:
+    """ Number of nodes in the subtree rooted at current. """
+    return 0 if current is None else current.subtree_size
+
+
+class BalancedBinarySearchTree(BinarySearchTree[K, I]):
+    """
+        Weight-balanced binary search tree.
+        With weight = subtree_size + 1, neither subtree of a node weighs more than
+        DELTA times the other, so the depth is at most about 2.4 * log2(N).
+        GAMMA decides between a single and a double rotation, as in Hirai and Yamamoto's
+        "Balancing weight-balanced trees" (DELTA = 3, GAMMA = 2).
+    """
+
+    DELTA = 3
+    GAMMA = 2
+
+    def insert_aux(self, current: TreeNode, key: K, item: I) -> TreeNode:
+        """
+            Attempts to insert an item into the tree, it uses the Key to insert it,
+            and rebalances every node on the way back up.
+            :complexity: O(CompK * log(N)) where N is the number of nodes
+        """
+        if current is None:  # base case: at the leaf
+            self.length += 1
+            return TreeNode(key, item=item)
+        elif key < current.key:
+            current.left = self.insert_aux(current.left, key, item)
+        elif key > current.key:
+            current.right = self.insert_aux(current.right, key, item)
+        else:  # key == current.key
+            raise ValueError('Inserting duplicate item')
+        current.subtree_size += 1
+        return self.rebalance(current)
+
+    def delete_aux(self, current: TreeNode, key: K) -> TreeNode:
+        """
+            Attempts to delete an item from the tree, it uses the Key to
+            determine the node to delete, and rebalances every node on the way back up.
+            :complexity: O(CompK * log(N)) where N is the number of nodes
+        """
+        if current is None:  # key not found
+            raise ValueError('Deleting non-existent item')
+        elif key < current.key:
+            current.left = self.delete_aux(current.left, key)
+        elif key > current.key:
+            current.right = self.delete_aux(current.right, key)
+        else:  # we found our key => do actual deletion
+            if current.left is None:
+                self.length -= 1
+                return current.right
+            elif current.right is None:
+                self.length -= 1
+                return current.left
+
+            # general case => find a successor
+            succ = self.get_successor(current)
+            current.key = succ.key
+            current.item = succ.item
+            current.right = self.delete_aux(current.right, succ.key)
+        current.subtree_size -= 1
+        return self.rebalance(current)
+
+    def rebalance(self, current: TreeNode) -> TreeNode:
+        """
+            Restores the balance of current after one insertion or deletion below it,
+            and returns the new root of its subtree.
+            :pre: both subtrees of current are balanced
+            :complexity: O(1)
+        """
+        left_weight = size(current.left) + 1
+        right_weight = size(current.right) + 1
+        if right_weight > self.DELTA * left_weight:
+            right = current.right
+            if size(right.left) + 1 >= self.GAMMA * (size(right.right) + 1):
+                current.right = self.rotate_right(right)
+            return self.rotate_left(current)
+        elif left_weight > self.DELTA * right_weight:
+            left = current.left
+            if size(left.right) + 1 >= self.GAMMA * (size(left.left) + 1):
+                current.left = self.rotate_left(left)
+            return self.rotate_right(current)
+        return current
+
+    def rotate_left(self, current: TreeNode) -> TreeNode:
+        """
+            Makes the right child of current the root of its subtree, and returns it.
+            :complexity: O(1)
+        """
+        pivot = current.right
+        current.right = pivot.left
+        pivot.left = current
+        pivot.subtree_size = current.subtree_size
+        current.subtree_size = size(current.left) + size(current.right) + 1
+        return pivot
+
+    def rotate_right(self, current: TreeNode) -> TreeNode:
+        """
+            Makes the left child of current the root of its subtree, and returns it.
+            :complexity: O(1)
+        """
+        pivot = current.left
+        current.left = pivot.right
+        pivot.right = current
+        pivot.subtree_size = current.subtree_size
+        current.subtree_size = size(current.left) + size(current.right) + 1
+        return pivot
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
-from typing import List
-from heap import MaxHeap
+from typing import List, Callable, Iterable
+from heap import IndexedMaxHeap, MaxHeap
+from threedeebeetree import ThreeDeeBeeTree, BeeNode, Point, INFINITE_REGION, octant_region
 
 @dataclass
 class Beehive:
@@ -15,7 +16,19 @@ class BeehiveSelector:
 
     def __init__(self, max_beehives: int):
         self.max_beehives = max_beehives
-        self.beehives = []
+        self.beehives = IndexedMaxHeap(0, growable=True)
+        # Heap handle of every hive, by id(hive), so its entry can be updated in place.
+        self.handles = {}
+        # Insertion counter, used to break ties in favour of the earliest added hive.
+        self.order = 0
+
+    @staticmethod
+    def emeralds(hive: Beehive) -> int:
+        """
+        Returns the number of emeralds the hive would yield if harvested now.
+        :complexity: O(1)
+        """
+        return min(hive.capacity, hive.volume) * hive.nutrient_factor
 
     def set_all_beehives(self, hive_list: list[Beehive]):
         """
@@ -23,49 +36,316 @@ class BeehiveSelector:
 
         Complexity:
         - Best Case: O(1) if the hive_list is empty or contains a small number of beehives.
-        - Worst Case: O(M) where M is the length of hive_list.
+        - Worst Case: O(M) where M is the length of hive_list, as the heap is built bottom-up.
+
+        :raises ValueError: if the same hive appears twice in the hives kept, as each hive has
+        a single heap entry
         """
-        self.beehives = hive_list[:self.max_beehives]
+        hive_list = hive_list[:self.max_beehives]
+        if len({id(hive) for hive in hive_list}) < len(hive_list):
+            raise ValueError("The same beehive is given twice")
+        self.beehives = IndexedMaxHeap.heapify(
+            ((self.emeralds(hive), -order, hive) for order, hive in enumerate(hive_list)),
+            growable=True,
+        )
+        # heapify hands out handles in order, starting from 0.
+        self.handles = {id(hive): handle for handle, hive in enumerate(hive_list)}
+        self.order = len(hive_list)
 
     def add_beehive(self, hive: Beehive):
         """
            Add a new beehive to the BeehiveSelector structure.
 
-           Best case complexity: O(log(n)), where n is the number of beehives currently in the structure. This occurs when the heap
-           is balanced, so the height of the tree is logarithmically proportional to the number of nodes in the heap.
+           Heap entries are (emeralds, -order, hive) tuples, so that among hives with the same yield
+           the one added first is considered the largest. The order is unique, so the hive itself is
+           never compared.
+
+           Best case complexity: O(1), when the new hive does not rise past its parent,
+           or the selector already holds max_beehives hives.
 
-           Worst case complexity: O(n), where n is the number of elements in the heap. This occurs if we need to traverse through every
-           element and compare n times before we find the correct position to append the new hive.
+           Worst case complexity: O(log(n)), where n is the number of beehives currently in the structure,
+           when the new hive rises all the way to the root of the heap.
+
+           :raises ValueError: if the hive is already in the selector
         """
+        if id(hive) in self.handles:
+            raise ValueError("Beehive already in the selector")
         if len(self.beehives) < self.max_beehives:
-            self.beehives.append(hive)
+            self.handles[id(hive)] = self.beehives.add((self.emeralds(hive), -self.order, hive))
+            self.order += 1
+
+    def update_beehive(self, hive: Beehive):
+        """
+        Re-rank a beehive already in the selector after its capacity, volume or
+        nutrient_factor changed.
+
+        :raises KeyError: if the hive is not in the selector
+        :complexity: O(log(n)), where n is the number of beehives in the structure.
+        """
+        handle = self.handles[id(hive)]
+        _, order, _ = self.beehives.get(handle)
+        self.beehives.update(handle, (self.emeralds(hive), order, hive))
 
+    def remove_beehive(self, hive: Beehive):
+        """
+        Remove a beehive from the selector.
+
+        :raises KeyError: if the hive is not in the selector
+        :complexity: O(log(n)), where n is the number of beehives in the structure.
+        """
+        self.beehives.remove(self.handles.pop(id(hive)))
 
     def harvest_best_beehive(self):
         """
        Select and harvest the beehive that yields the most emeralds.
 
-       Best case complexity: O(log(n)), where n is the number of beehives currently in the structure. This occurs when the tree
-       is balanced, so the height of the tree is logarithmically proportional to the number of nodes in the tree, meaning the
-       method only has to traverse log(n) nodes to find the hive.
+       The best hive is at the top of the heap; once harvested, its entry sinks with its
+       reduced yield and keeps its original insertion order.
 
-       Worst case complexity: O(n), where n is the number of beehives in the structure. This occurs when the hive we are looking
-       for is at the maximum depth of an unbalance heap, so we have to traverse n beehives to find the maximum one for harvest.
+       Best case complexity: O(1), when there are no beehives, or no beehive has emeralds left.
+
+       Worst case complexity: O(log(n)), where n is the number of beehives in the structure,
+       as the harvested hive sinks down the heap.
         """
-        if not self.beehives:
+        if len(self.beehives) == 0:
+            return 0.0
+
+        max_emeralds, order, best_hive = self.beehives.peek_max()
+        if max_emeralds <= 0:
             return 0.0
 
-        max_emeralds = 0.0
-        best_hive = None
+        best_hive.volume -= min(best_hive.capacity, best_hive.volume)
+        self.beehives.decrease_key(self.beehives.max_handle(), (self.emeralds(best_hive), order, best_hive))
+
+        return max_emeralds
+
+    def harvest_many(self, k: int) -> list:
+        """
+        Harvest the best beehive k times in a row, returning the emeralds of each harvest.
+        Gives the same results as k calls to harvest_best_beehive.
+
+        While the best hive holds at least its capacity, its yield and heap entry do not
+        change, so it stays the best hive: all those harvests are taken at once, and the
+        heap is only updated when the hive runs low.
+
+        Best case complexity: O(k + log(n)), where n is the number of beehives, when the
+        best hive has enough volume for all k harvests.
+
+        Worst case complexity: O(k * log(n)), when every harvest changes the best hive.
+        """
+        harvested = []
+        heap = self.beehives
+        while len(harvested) < k and len(heap) > 0:
+            emeralds, order, hive = heap.peek_max()
+            if emeralds <= 0:
+                break
+            # Subtract one capacity at a time, as single harvests would, so that hives with
+            # float stats end up with exactly the same volume.
+            full_harvests = 0
+            while full_harvests < k - len(harvested) and hive.volume >= hive.capacity > 0:
+                hive.volume -= hive.capacity
+                full_harvests += 1
+            if full_harvests > 0:
+                harvested.extend([emeralds] * full_harvests)
+            else:
+                harvested.append(emeralds)
+                hive.volume -= min(hive.capacity, hive.volume)
+            heap.decrease_key(heap.max_handle(), (self.emeralds(hive), order, hive))
+
+        harvested.extend([0.0] * (k - len(harvested)))
+        return harvested
+
+
+@dataclass(slots=True)
+class BeehiveNode(BeeNode):
+    """
+    Node of a BeehiveTree. Its item is the list of (-order, hive) entries of the hives at its key,
+    and best is the largest (emeralds, -order) entry of any hive in its subtree.
+    """
+    best: tuple = (0, 0)
+
+
+class BeehiveTree(ThreeDeeBeeTree):
+    """ 3️⃣🇩🐝🌳 tree of beehives, annotated with the best yield of each subtree. """
+
+    node_type = BeehiveNode
+
+    def refresh(self, nodes: Iterable[BeehiveNode]) -> None:
+        """
+        Recompute the best entry of each of the given nodes, which must come after their children.
+        :complexity: O(M * H) where M is the number of nodes and H the number of hives at one position.
+        """
+        for node in nodes:
+            best = (0, 0)
+            for order, hive in node.item or ():
+                best = max(best, (BeehiveSelector.emeralds(hive), order))
+            for child in node.children:
+                if child is not None and child.best > best:
+                    best = child.best
+            node.best = best
+
+    def annotate(self, node: BeehiveNode) -> None:
+        """
+        Recompute the best entry of every node in the subtree of node, from the bottom up,
+        as nodes built or rebuilt from median splits start with none.
+        :complexity: O(M * H) where M is the number of nodes in the subtree and H the number of hives at one position.
+        """
+        preorder = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            preorder.append(current)
+            stack.extend(filter(None, current.children))
+        self.refresh(reversed(preorder))
+
+
+class SpatialBeehiveSelector:
+    """
+    Beehive selector that can restrict harvests to a region of space.
+    Hives are stored in a BeehiveTree by position, so a search can skip every octant
+    that is outside the region, or whose best hive is no better than one already found.
+    Ties are broken in favour of the earliest added hive, as in BeehiveSelector.
+    """
+
+    def __init__(self, max_beehives: int):
+        self.max_beehives = max_beehives
+        self.tree = BeehiveTree()
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def set_all_beehives(self, hive_list: list[Beehive]):
+        """
+        Replace all current beehives with the given list of beehives.
+        The hives are grouped by position and the tree is built balanced in one go, whatever
+        the order of the hives, with its best entries filled in by BeehiveTree.annotate.
+        :complexity: O(M * log(M)) where M is the length of hive_list.
+        """
+        hive_list = hive_list[:self.max_beehives]
+        positions = {}
+        for order, hive in enumerate(hive_list):
+            positions.setdefault((hive.x, hive.y, hive.z), []).append((-order, hive))
+        self.tree = BeehiveTree.from_points(positions, positions.values())
+        self.count = len(hive_list)
+
+    def add_beehive(self, hive: Beehive):
+        """
+        Add a new beehive, raising the best entry of every subtree on its path.
+        :complexity: O(D) where D is the depth of the hive's node in the tree.
+        """
+        if self.count >= self.max_beehives:
+            return
+        key = (hive.x, hive.y, hive.z)
+        order = -self.count
+        entry = (order, hive)
+        if key in self.tree:
+            path = self.tree.get_path_to_key(key)
+            path[-1].item.append(entry)
+        else:
+            self.tree[key] = [entry]
+            path = self.tree.get_path_to_key(key)
+        self.count += 1
+
+        best = (BeehiveSelector.emeralds(hive), order)
+        for node in path:
+            if best > node.best:
+                node.best = best
+
+    def update_beehive(self, hive: Beehive):
+        """
+        Re-rank a beehive already in the selector after its stats changed.
+        Moving a hive is not supported, as its position is its key.
+        :raises KeyError: if there is no hive at the hive's position
+        :complexity: O(D * H) where D is the depth of the hive's node and H the number of hives at one position.
+        """
+        self.refresh_path(self.tree.get_path_to_key((hive.x, hive.y, hive.z)))
 
-        for hive in self.beehives:
-            honey_taken = min(hive.capacity, hive.volume)
-            emeralds = honey_taken * hive.nutrient_factor
-            if emeralds > max_emeralds:
-                max_emeralds = emeralds
-                best_hive = hive
+    def refresh_path(self, path: list[BeehiveNode]) -> None:
+        """
+        Recompute the best entry of each node on the path, from the bottom up.
+        :complexity: O(D * H) where D is the length of the path and H the number of hives at one position.
+        """
+        self.tree.refresh(reversed(path))
 
-        if best_hive is not None:
-            best_hive.volume -= min(best_hive.capacity, best_hive.volume)
+    def harvest_best_beehive(self):
+        """
+        Select and harvest the beehive that yields the most emeralds.
+        :complexity: O(D * H), see harvest_best_in_region
+        """
+        return self.harvest_best_in_region(lambda point: True, lambda lo, hi: True)
 
-        return max_emeralds
\ No newline at end of file
+    def harvest_best_in_box(self, lo: Point, hi: Point):
+        """
+        Select and harvest the best beehive whose position is in the box [lo, hi], bounds included.
+        :complexity: see harvest_best_in_region
+        """
+        def in_box(point: Point) -> bool:
+            return all(lo[axis] <= point[axis] <= hi[axis] for axis in range(3))
+
+        def meets_box(region_lo: tuple, region_hi: tuple) -> bool:
+            return all(region_lo[axis] <= hi[axis] and lo[axis] < region_hi[axis] for axis in range(3))
+
+        return self.harvest_best_in_region(in_box, meets_box)
+
+    def harvest_best_in_radius(self, centre: Point, radius: float):
+        """
+        Select and harvest the best beehive within Euclidean distance radius of centre.
+        :complexity: see harvest_best_in_region
+        """
+        def in_ball(point: Point) -> bool:
+            return sum((point[axis] - centre[axis]) ** 2 for axis in range(3)) <= radius ** 2
+
+        def meets_ball(region_lo: tuple, region_hi: tuple) -> bool:
+            distance = 0
+            for axis in range(3):
+                if centre[axis] < region_lo[axis]:
+                    distance += (region_lo[axis] - centre[axis]) ** 2
+                elif centre[axis] > region_hi[axis]:
+                    distance += (centre[axis] - region_hi[axis]) ** 2
+            return distance <= radius ** 2
+
+        return self.harvest_best_in_region(in_ball, meets_ball)
+
+    def harvest_best_in_region(self, contains: Callable[[Point], bool], meets: Callable[[tuple, tuple], bool]):
+        """
+        Select and harvest the best beehive at a position for which contains is true.
+        meets(lo, hi) must be true whenever the region [lo, hi) may hold such a position.
+
+        Subtrees are explored best-first by their best entry, and the search stops as soon as
+        no remaining subtree can beat the best hive found in the region so far.
+
+        Best case complexity: O(D * H), where D is the depth of the tree and H the number of hives
+        at one position, when the best hive overall lies in the region.
+
+        Worst case complexity: O(N * log(N)), where N is the number of nodes, when every subtree
+        meets the region but holds only hives outside of it.
+        """
+        if self.tree.root is None or self.tree.root.best[0] <= 0:
+            return 0.0
+
+        best, best_hive, best_node = (0, 0), None, None
+        frontier = MaxHeap(0, growable=True)
+        lo, hi = INFINITE_REGION
+        # The order part of a best entry is unique, so nodes and regions are never compared.
+        frontier.add((self.tree.root.best, self.tree.root, lo, hi))
+        while len(frontier) > 0:
+            node_best, node, lo, hi = frontier.get_max()
+            if node_best <= best:
+                break
+            if contains(node.key):
+                for order, hive in node.item:
+                    entry = (BeehiveSelector.emeralds(hive), order)
+                    if entry > best:
+                        best, best_hive, best_node = entry, hive, node
+            for octant, child in enumerate(node.children):
+                if child is not None and child.best > best:
+                    child_lo, child_hi = octant_region(node.key, octant, lo, hi)
+                    if meets(child_lo, child_hi):
+                        frontier.add((child.best, child, child_lo, child_hi))
+
+        if best_hive is None:
+            return 0.0
+        best_hive.volume -= min(best_hive.capacity, best_hive.volume)
+        self.refresh_path(self.tree.get_path_to_key(best_node.key))
+        return best[0]
@@ -0,0 +1,35 @@
+""" Benchmarks for BeehiveSelector.
+    Run from the repository root with: python -m benchmarks.bench_beehive
+"""
+import random
+import timeit
+
+from beehive import Beehive, BeehiveSelector
+
+
+def make_selector(n: int, seed: int) -> BeehiveSelector:
+    rng = random.Random(seed)
+    selector = BeehiveSelector(n)
+    selector.set_all_beehives([
+        Beehive(rng.randint(0, 10 ** 6), rng.randint(0, 10 ** 6), rng.randint(0, 10 ** 6),
+                capacity=rng.randint(1, 50), nutrient_factor=rng.randint(1, 100), volume=rng.randint(0, 1000))
+        for _ in range(n)
+    ])
+    return selector
+
+
+def harvest_loop(selector: BeehiveSelector, k: int) -> list:
+    return [selector.harvest_best_beehive() for _ in range(k)]
+
+
+def bench_harvest_many(n: int = 10 ** 4, k: int = 10 ** 5) -> None:
+    loop = min(timeit.repeat(lambda: harvest_loop(make_selector(n, 1), k), number=1, repeat=3))
+    batch = min(timeit.repeat(lambda: make_selector(n, 1).harvest_many(k), number=1, repeat=3))
+    setup = min(timeit.repeat(lambda: make_selector(n, 1), number=1, repeat=3))
+    loop, batch = loop - setup, batch - setup
+    print('n={0} k={1}  harvest_best_beehive loop: {2:.3f}s  harvest_many: {3:.3f}s  speedup: {4:.2f}x'.format(
+        n, k, loop, batch, loop / batch))
+
+
+if __name__ == '__main__':
+    bench_harvest_many()
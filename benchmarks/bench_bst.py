@@ -0,0 +1,140 @@
+""" Benchmarks for BinarySearchTree.
+    Run from the repository root with: python -m benchmarks.bench_bst
+"""
+from __future__ import annotations
+
+import gc
+import random
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+
+from array_bst import ArrayBinarySearchTree
+from bst import BinarySearchTree
+from node import TreeNode
+
+
+def degenerate_tree(n: int) -> BinarySearchTree:
+    """
+    Returns the tree that inserting the keys 0 to n - 1 in order gives: a chain of right children.
+    It is linked directly, as building it by insertion takes O(n^2).
+    """
+    bst = BinarySearchTree()
+    bst.root = current = TreeNode(0, item=0, subtree_size=n)
+    for key in range(1, n):
+        current.right = current = TreeNode(key, item=key, subtree_size=n - key)
+    bst.length = n
+    return bst
+
+
+def balanced_tree(n: int) -> BinarySearchTree:
+    """ Returns a perfectly balanced tree holding the keys 0 to n - 1, linked directly. """
+    def link(lo: int, hi: int) -> TreeNode | None:
+        if lo >= hi:
+            return None
+        middle = (lo + hi) // 2
+        return TreeNode(middle, item=middle, left=link(lo, middle), right=link(middle + 1, hi), subtree_size=hi - lo)
+
+    bst = BinarySearchTree()
+    bst.root = link(0, n)
+    bst.length = n
+    return bst
+
+
+def bench_deep_tree(n: int = 10 ** 5, count: int = 100) -> None:
+    """ Operations at the bottom of a tree of depth n, far beyond the recursion limit. """
+    bst = degenerate_tree(n)
+    new_keys = range(n, n + count)
+
+    def insert():
+        for key in new_keys:
+            bst[key] = key
+
+    def look_up():
+        for key in new_keys:
+            bst[key]
+
+    def delete():
+        for key in new_keys:
+            del bst[key]
+
+    for name, operation in (('insert', insert), ('lookup', look_up), ('delete', delete)):
+        seconds = timeit.timeit(operation, number=1)
+        print('depth {0}: {1:>6}  {2:.2f}ms per key'.format(n, name, 1000 * seconds / count))
+
+
+def bench_select(n: int = 10 ** 6, count: int = 10) -> None:
+    """ Finding keys near the end of the order, by in-order walk and by subtree sizes. """
+    bst = balanced_tree(n)
+    ks = range(n - count, n)
+    walk = timeit.timeit(lambda: [bst.kth_smallest(k, bst.root) for k in ks], number=1)
+    select = timeit.timeit(lambda: [bst.select(k) for k in ks], number=1)
+    rank = timeit.timeit(lambda: [bst.rank(k) for k in ks], number=1)
+    print('n={0}, k near n: kth_smallest {1:.1f}ms  select {2:.4f}ms  rank {3:.4f}ms per query'.format(
+        n, 1000 * walk / count, 1000 * select / count, 1000 * rank / count))
+
+
+def bench_bulk_build(n: int = 10 ** 6) -> None:
+    """ Loading n pairs, one by one in random order and with from_sorted. """
+    pairs = [(key, key) for key in range(n)]
+    shuffled = pairs[:]
+    random.shuffle(shuffled)
+
+    def insert_all():
+        bst = BinarySearchTree()
+        for key, item in shuffled:
+            bst[key] = item
+
+    inserting = timeit.timeit(insert_all, number=1)
+    loading = timeit.timeit(lambda: BinarySearchTree.from_sorted(pairs), number=1)
+    print('n={0}: __setitem__ in random order {1:.2f}s  from_sorted {2:.2f}s  speedup: {3:.1f}x'.format(
+        n, inserting, loading, inserting / loading))
+
+
+@dataclass
+class DictTreeNode:
+    """ TreeNode as it was before it was slotted: the same fields, kept in a per-instance __dict__. """
+    key: object
+    item: object = None
+    left: DictTreeNode | None = None
+    right: DictTreeNode | None = None
+    subtree_size: int = 1
+
+
+def bench_node_memory(n: int = 10 ** 6) -> None:
+    """ Bytes allocated per node for a chain of n nodes, with and without slots. """
+    keys = list(range(n))  # allocated up front so that only the nodes are traced
+    for node_type in (DictTreeNode, TreeNode):
+        tracemalloc.start()
+        head = current = node_type(keys[0])
+        for key in keys[1:]:
+            current.right = current = node_type(key)
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del head, current
+        print('{0:>12}: {1:.1f} bytes per node'.format(node_type.__name__, allocated / n))
+
+
+def bench_array_bst(n: int = 10 ** 6, count: int = 10 ** 5) -> None:
+    """ Memory, lookups and a full in-order walk for the linked and the array-backed tree. """
+    pairs = [(key, None) for key in range(n)]
+    queries = random.sample(range(n), count)
+    for tree_type in (BinarySearchTree, ArrayBinarySearchTree):
+        tracemalloc.start()
+        tree = tree_type.from_sorted(pairs)
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        look_up = timeit.timeit(lambda: [tree[key] for key in queries], number=1)
+        walk = timeit.timeit(lambda: sum(tree.keys()), number=1)
+        collect = timeit.timeit(gc.collect, number=1)
+        print('{0:>21}: {1:.1f} bytes per node  lookup {2:.2f}us  walk {3:.2f}s  gc.collect {4:.3f}s'.format(
+            tree_type.__name__, allocated / n, 1e6 * look_up / count, walk, collect))
+        del tree
+
+
+if __name__ == '__main__':
+    bench_deep_tree()
+    bench_select()
+    bench_bulk_build()
+    bench_node_memory()
+    bench_array_bst()
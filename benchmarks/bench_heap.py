@@ -0,0 +1,32 @@
+""" Benchmarks for the array based MaxHeap.
+    Run from the repository root with: python -m benchmarks.bench_heap
+"""
+import random
+import timeit
+
+from heap import MaxHeap
+
+
+def build_by_adding(items: list) -> MaxHeap:
+    heap = MaxHeap(len(items))
+    for item in items:
+        heap.add(item)
+    return heap
+
+
+def bench_heapify(sizes=(10 ** 5, 10 ** 6)) -> None:
+    for n in sizes:
+        for order, items in (('random', [random.random() for _ in range(n)]),
+                             ('ascending', list(range(n)))):
+            bench_build(order, items)
+
+
+def bench_build(order: str, items: list) -> None:
+    adding = min(timeit.repeat(lambda: build_by_adding(items), number=1, repeat=3))
+    heapify = min(timeit.repeat(lambda: MaxHeap.heapify(items), number=1, repeat=3))
+    print('n={0:>8} {1:>9}  add: {2:7.3f}s  heapify: {3:7.3f}s  speedup: {4:5.2f}x'.format(
+        len(items), order, adding, heapify, adding / heapify))
+
+
+if __name__ == '__main__':
+    bench_heapify()
@@ -0,0 +1,99 @@
+""" Benchmarks for Percentiles.
+    Run from the repository root with: python -m benchmarks.bench_ratio
+"""
+import bisect
+import random
+import sys
+import timeit
+from math import ceil
+
+from ratio import Percentiles, TreePercentiles, ApproximatePercentiles
+
+
+def sorting_ratio(percentiles: Percentiles, x, y) -> list:
+    """ Percentiles.ratio as it was, sorting the points on every query. """
+    n = len(percentiles.points)
+    return sorted(percentiles.points)[ceil(n * x / 100):n - ceil(n * y / 100)]
+
+
+def bench_ratio(n: int = 10 ** 6, queries: int = 1000) -> None:
+    """ Narrow and wide ratio queries, with a slice of the sorted points and by sorting them. """
+    p = Percentiles()
+    p.points = sorted(random.sample(range(10 * n), n))
+    for name, (x, y) in (('narrow', (49.9, 50)), ('wide', (10, 10))):
+        count = queries if name == 'narrow' else queries // 10
+        slicing = timeit.timeit(lambda: p.ratio(x, y), number=count) / count
+        sorting = timeit.timeit(lambda: sorting_ratio(p, x, y), number=3) / 3
+        print('n={0} {1:>6} ratio({2}, {3}): {4} points  slice {5:.4f}ms  sorted {6:.1f}ms  speedup: {7:.0f}x'.format(
+            n, name, x, y, len(p.ratio(x, y)), 1000 * slicing, 1000 * sorting, sorting / slicing))
+
+
+def bench_tree_percentiles(n: int = 10 ** 5, count: int = 10 ** 4, queries: int = 1000) -> None:
+    """ Adds, removes and narrow ratio queries against n points, with the sorted list and the tree. """
+    rng = random.Random(5)
+    points = [rng.random() for _ in range(n)]
+    new_points = [rng.random() for _ in range(count)]
+    for percentiles_type in (Percentiles, TreePercentiles):
+        p = percentiles_type()
+        build = timeit.timeit(lambda: [p.add_point(point) for point in points], number=1)
+        add = timeit.timeit(lambda: [p.add_point(point) for point in new_points], number=1)
+        remove = timeit.timeit(lambda: [p.remove_point(point) for point in new_points], number=1)
+        ratio = timeit.timeit(lambda: p.ratio(49.9, 50), number=queries)
+        print('{0:>15} n={1}: build {2:.2f}s  add {3:.1f}us  remove {4:.1f}us  narrow ratio {5:.1f}us'.format(
+            percentiles_type.__name__, n, build, 1e6 * add / count, 1e6 * remove / count, 1e6 * ratio / queries))
+
+
+def bench_approximate_percentiles(n: int = 10 ** 6, ks: tuple = (50, 200, 800, 3200), seeds: int = 3) -> None:
+    """
+    Accuracy against memory of ApproximatePercentiles for several k, measured against the
+    exact Percentiles: the worst rank error over the percentiles 0.1 to 99.9, as a fraction
+    of n, and the points held and list bytes, which are all the sketch's memory but the points.
+    """
+    rng = random.Random(6)
+    points = [rng.lognormvariate(0, 1) for _ in range(n)]
+    exact = Percentiles()
+    add_time = timeit.timeit(lambda: exact.points.extend(sorted(points)), number=1)
+    print('{0:>11} n={1}: {2} points held  {3:.1f}MB of list  build {4:.2f}s'.format(
+        'Percentiles', n, len(exact), sys.getsizeof(exact.points) / 2 ** 20, add_time))
+    ps = [p / 10 for p in range(1, 1000)]
+    for k in ks:
+        worst = 0
+        for seed in range(seeds):
+            sketch = ApproximatePercentiles(k, seed)
+            add_time = timeit.timeit(lambda: [sketch.add_point(point) for point in points], number=1)
+            for p in ps:
+                wanted = max(1, ceil(n * p / 100)) - 1
+                worst = max(worst, abs(bisect.bisect_left(exact.points, sketch.percentile(p)) - wanted) / n)
+        held = sum(sys.getsizeof(compactor) for compactor in sketch.compactors)
+        print('{0:>11} k={1}: {2} points held  {3:.1f}KB of lists  add {4:.2f}us  worst rank error {5:.4%} '
+              '(k times error {6:.2f})'.format('sketch', k, sketch.retained(), held / 2 ** 10,
+                                               1e6 * add_time / n, worst, k * worst))
+
+
+def bench_batches(n: int = 10 ** 6, m: int = 10 ** 5) -> None:
+    """ Adding and then removing a batch of m points against n, point by point and in one call. """
+    rng = random.Random(7)
+    points = sorted(rng.random() for _ in range(n))
+    batch = [rng.random() for _ in range(m)]
+    for percentiles_type in (Percentiles, TreePercentiles):
+        timings = []
+        for batched in (False, True):
+            p = percentiles_type()
+            p.add_points(points)
+            if batched:
+                add = timeit.timeit(lambda: p.add_points(batch), number=1)
+                remove = timeit.timeit(lambda: p.remove_points(batch), number=1)
+            else:
+                add = timeit.timeit(lambda: [p.add_point(point) for point in batch], number=1)
+                remove = timeit.timeit(lambda: [p.remove_point(point) for point in batch], number=1)
+            timings.append((add, remove))
+        (add, remove), (add_points, remove_points) = timings
+        print('{0:>15} n={1} m={2}: add_point {3:.2f}s  add_points {4:.2f}s  remove_point {5:.2f}s  '
+              'remove_points {6:.2f}s'.format(percentiles_type.__name__, n, m, add, add_points, remove, remove_points))
+
+
+if __name__ == '__main__':
+    bench_ratio()
+    bench_tree_percentiles()
+    bench_approximate_percentiles()
+    bench_batches()
@@ -0,0 +1,178 @@
+""" Benchmarks for ThreeDeeBeeTree.
+    Run from the repository root with: python -m benchmarks.bench_threedeebeetree
+"""
+from __future__ import annotations
+
+import gc
+import heapq
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+from dataclasses import dataclass, field
+
+from threedeebeetree import ThreeDeeBeeTree, BeeNode
+
+
+def random_points(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [(rng.randint(0, 10 ** 7), rng.randint(0, 10 ** 7), rng.randint(0, 10 ** 7)) for _ in range(n)]
+
+
+def build_by_inserting(points: list) -> ThreeDeeBeeTree:
+    tdbt = ThreeDeeBeeTree()
+    for i, point in enumerate(points):
+        tdbt[point] = i
+    return tdbt
+
+
+def depth(node) -> int:
+    deepest = 0
+    stack = [(node, 1)]
+    while stack:
+        node, level = stack.pop()
+        deepest = max(deepest, level)
+        stack.extend((child, level + 1) for child in filter(None, node.children))
+    return deepest
+
+
+def bench_from_points(n: int = 10 ** 6) -> None:
+    points = random_points(n)
+    start = timeit.default_timer()
+    inserted = build_by_inserting(points)
+    middle = timeit.default_timer()
+    loaded = ThreeDeeBeeTree.from_points(points, range(n))
+    end = timeit.default_timer()
+    print('build n={0}  insert loop: {1:.2f}s (depth {2})  from_points: {3:.2f}s (depth {4})'.format(
+        n, middle - start, depth(inserted.root), end - middle, depth(loaded.root)))
+
+
+def bench_from_points_parallel(n: int = 10 ** 6, worker_counts: tuple = (1, 2, 4, 8)) -> None:
+    """ from_points_parallel against the serial from_points, for several numbers of workers. """
+    points = random_points(n)
+    serial = timeit.timeit(lambda: ThreeDeeBeeTree.from_points(points, range(n)), number=1)
+    print('from_points n={0}: {1:.2f}s on {2} CPUs'.format(n, serial, os.cpu_count()))
+    for workers in worker_counts:
+        parallel = timeit.timeit(lambda: ThreeDeeBeeTree.from_points_parallel(points, range(n), workers), number=1)
+        print('  from_points_parallel, {0} workers: {1:.2f}s  speedup: {2:.2f}x'.format(workers, parallel, serial / parallel))
+
+
+def brute_force_nearest(points: list, query: tuple, k: int) -> list:
+    return heapq.nsmallest(k, points, key=lambda p: sum((a - b) ** 2 for a, b in zip(p, query)))
+
+
+def bench_nearest(n: int = 10 ** 5, k: int = 10, queries: int = 100) -> None:
+    points = random_points(n)
+    tdbt = build_by_inserting(points)
+    targets = random_points(queries, seed=1)
+    tree = min(timeit.repeat(lambda: [tdbt.nearest(q, k) for q in targets], number=1, repeat=3))
+    brute = min(timeit.repeat(lambda: [brute_force_nearest(points, q, k) for q in targets], number=1, repeat=1))
+    print('nearest n={0} k={1}  tree: {2:.2f}ms/query  brute force: {3:.2f}ms/query  speedup: {4:.1f}x'.format(
+        n, k, 1000 * tree / queries, 1000 * brute / queries, brute / tree))
+
+
+def bench_expiry(n: int = 10 ** 5, steps: int = 10 ** 5) -> None:
+    """ A sliding window of n points: each step deletes the oldest point and inserts a new one. """
+    points = random_points(n + steps)
+    tdbt = ThreeDeeBeeTree.from_points(points[:n])
+    start = timeit.default_timer()
+    for step in range(steps):
+        del tdbt[points[step]]
+        tdbt[points[n + step]] = None
+    churn = timeit.default_timer() - start
+    rebuild = timeit.timeit(lambda: ThreeDeeBeeTree.from_points(points[steps:]), number=1)
+    print('expiry n={0}: {1:.1f}us per delete and insert ({2} rebuilds of {3} nodes, {4} tombstones left, '
+          'depth {5})  from_points of the window: {6:.2f}s'.format(
+              n, 1e6 * churn / steps, tdbt.rebuilds, tdbt.rebuilt_nodes, tdbt.tombstones, depth(tdbt.root), rebuild))
+
+
+def bench_balance_ratio(n: int = 10 ** 4, queries: int = 10 ** 4) -> None:
+    """
+    Online inserts with and without balancing: along a line, the worst case for the plain
+    tree, along a line of points sharing x and y, on a shuffled grid where many points share
+    each coordinate, and at random, where balancing only adds its checks.
+    """
+    # The plain tree's recursive insert_aux goes n levels deep on the lines.
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), n + 100))
+    side = int((n // 4) ** 0.5)
+    grid = [(x, y, z) for x in range(4) for y in range(side) for z in range(side)]
+    random.Random(5).shuffle(grid)
+    shapes = (('line', [(i, 2 * i, 3 * i) for i in range(n)]), ('tied', [(0, 0, i) for i in range(n)]),
+              ('grid', grid), ('random', random_points(n)))
+    for shape, points in shapes:
+        targets = random.Random(4).choices(points, k=queries)
+        for balance_ratio in (None, 7):
+            tdbt = ThreeDeeBeeTree(balance_ratio)
+
+            def insert_all():
+                for point in points:
+                    tdbt[point] = None
+
+            insert = timeit.timeit(insert_all, number=1)
+            look_up = timeit.timeit(lambda: tdbt.get_many(targets), number=1)
+            print('{0:>6} balance_ratio={1}: insert {2:.1f}us  lookup {3:.1f}us per point  depth {4}  '
+                  '{5} rebuilds of {6} nodes'.format(shape, balance_ratio, 1e6 * insert / len(points), 1e6 * look_up / queries,
+                                                     depth(tdbt.root), tdbt.rebuilds, tdbt.rebuilt_nodes))
+
+
+@dataclass
+class DictBeeNode:
+    """ BeeNode as it was before it was slotted: a __dict__, and a dict of children by octant. """
+    key: tuple
+    item: object
+    subtree_size: int = 1
+    children: dict[int, DictBeeNode] = field(default_factory=dict)
+
+    def get_child_for_key(self, point: tuple) -> DictBeeNode | None:
+        x, y, z = point
+        octant = 0
+        if x >= self.key[0]:
+            octant |= 1
+        if y >= self.key[1]:
+            octant |= 2
+        if z >= self.key[2]:
+            octant |= 4
+        return self.children.get(octant)
+
+
+def as_dict_nodes(node: BeeNode) -> DictBeeNode:
+    """ Copies the subtree of node into DictBeeNodes, sharing keys and items. """
+    copy = DictBeeNode(node.key, node.item, node.subtree_size)
+    for octant, child in enumerate(node.children):
+        if child is not None:
+            copy.children[octant] = as_dict_nodes(child)
+    return copy
+
+
+def find(root, key: tuple):
+    """ The walk of ThreeDeeBeeTree.get_tree_node_by_key, for either kind of node. """
+    current = root
+    while current is not None and current.key != key:
+        current = current.get_child_for_key(key)
+    return current
+
+
+def bench_nodes(n: int = 10 ** 6, count: int = 10 ** 5) -> None:
+    """ Memory per node and lookups for the same tree of n points, with slotted and dict nodes. """
+    points = random_points(n)
+    queries = random.Random(2).sample(points, count)
+    gc.collect()
+    tracemalloc.start()
+    tdbt = ThreeDeeBeeTree.from_points(points)
+    slotted, _ = tracemalloc.get_traced_memory()
+    root = as_dict_nodes(tdbt.root)
+    with_dicts, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for name, node, allocated in (('dict BeeNode', root, with_dicts - slotted), ('slotted BeeNode', tdbt.root, slotted)):
+        seconds = min(timeit.repeat(lambda: [find(node, key) for key in queries], number=1, repeat=3))
+        print('{0:>15}: {1:.1f} bytes per node  {2:.0f} lookups/s'.format(name, allocated / n, count / seconds))
+
+
+if __name__ == '__main__':
+    bench_from_points()
+    bench_from_points_parallel()
+    bench_nearest()
+    bench_expiry()
+    bench_balance_ratio()
+    bench_nodes()
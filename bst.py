@@ -8,8 +8,10 @@ from __future__ import annotations
 __author__ = 'Brendon Taylor, modified by Alexey Ignatiev, further modified by Jackson Goerner'
 __docformat__ = 'reStructuredText'
 
-from typing import TypeVar, Generic
+from typing import TypeVar, Generic, Iterator, Iterable
+from operator import itemgetter, lt
 from node import TreeNode
+from utils import paused_gc
 import sys
 
 
@@ -31,6 +33,45 @@ class BinarySearchTree(Generic[K, I]):
         self.root = None
         self.length = 0
 
+    @classmethod
+    def from_sorted(cls, pairs: Iterable[tuple[K, I]]) -> BinarySearchTree[K, I]:
+        """
+            Builds a perfectly balanced tree from (key, item) pairs in increasing order of key.
+            Each subtree is rooted at the middle pair of its range, so the subtree sizes are
+            known without counting.
+            :raises ValueError: if the keys are not strictly increasing
+            :complexity: O(N) where N is the number of pairs
+        """
+        keys, items = [], []
+        for key, item in pairs:
+            keys.append(key)
+            items.append(item)
+        if not all(map(lt, keys, keys[1:])):
+            raise ValueError('Keys are not strictly increasing')
+
+        def build(lo: int, hi: int) -> TreeNode | None:
+            """ Builds the subtree holding the pairs lo to hi - 1. """
+            if lo >= hi:
+                return None
+            middle = (lo + hi) // 2
+            return TreeNode(keys[middle], item=items[middle], left=build(lo, middle),
+                            right=build(middle + 1, hi), subtree_size=hi - lo)
+
+        tree = cls()
+        with paused_gc():
+            tree.root = build(0, len(keys))
+        tree.length = len(keys)
+        return tree
+
+    @classmethod
+    def from_unsorted(cls, pairs: Iterable[tuple[K, I]]) -> BinarySearchTree[K, I]:
+        """
+            Builds a perfectly balanced tree from (key, item) pairs in any order.
+            :raises ValueError: if a key is repeated
+            :complexity: O(N * log(N) * CompK) where N is the number of pairs, to sort them
+        """
+        return cls.from_sorted(sorted(pairs, key=itemgetter(0)))
+
     def is_empty(self) -> bool:
         """
             Checks to see if the bst is empty
@@ -43,6 +84,68 @@ class BinarySearchTree(Generic[K, I]):
 
         return self.length
 
+    def __iter__(self) -> Iterator[K]:
+        """
+            Iterates over the keys in increasing order.
+            :complexity: O(N) for the whole iteration, with O(D) memory where D is the depth of the tree
+        """
+        return self.keys()
+
+    def __reversed__(self) -> Iterator[K]:
+        """ Iterates over the keys in decreasing order. """
+        return (node.key for node in self.iter_nodes(reverse=True))
+
+    def keys(self) -> Iterator[K]:
+        """ Iterates over the keys in increasing order. """
+        return (node.key for node in self.iter_nodes())
+
+    def items(self) -> Iterator[tuple[K, I]]:
+        """ Iterates over the (key, item) pairs in increasing order of key. """
+        return ((node.key, node.item) for node in self.iter_nodes())
+
+    def iter_nodes(self, reverse: bool = False) -> Iterator[TreeNode]:
+        """
+            Yields the nodes in order of key, increasing unless reverse is set.
+            The stack holds the nodes whose key is still to come on the way down,
+            so at most D nodes where D is the depth of the tree.
+            The tree must not be changed while iterating.
+            :complexity: O(N) for the whole iteration, and O(D) for a single step
+        """
+        stack = []
+        current = self.root
+        while stack or current is not None:
+            while current is not None:
+                stack.append(current)
+                current = current.right if reverse else current.left
+            current = stack.pop()
+            yield current
+            current = current.left if reverse else current.right
+
+    def range(self, lo: K, hi: K | None = None) -> Iterator[tuple[K, I]]:
+        """
+            Yields the (key, item) pairs with lo <= key < hi, or lo <= key if hi is None,
+            in increasing order of key.
+            Subtrees with keys below lo are never entered, and iteration stops at the
+            first key not below hi.
+            :complexity: O(D + M) where D is the depth of the tree and M the number of pairs yielded
+        """
+        stack = []
+        current = self.root
+        while stack or current is not None:
+            while current is not None:
+                if current.key < lo:  # all of the left subtree is below lo too
+                    current = current.right
+                else:
+                    stack.append(current)
+                    current = current.left
+            if not stack:  # every key left is below lo
+                return
+            current = stack.pop()
+            if hi is not None and not current.key < hi:
+                return
+            yield current.key, current.item
+            current = current.right
+
     def __contains__(self, key: K) -> bool:
         """
             Checks to see if the key is in the BST
@@ -68,14 +171,19 @@ class BinarySearchTree(Generic[K, I]):
         return self.get_tree_node_by_key_aux(self.root, key)
 
     def get_tree_node_by_key_aux(self, current: TreeNode, key: K) -> TreeNode:
-        if current is None:
-            raise KeyError('Key not found: {0}'.format(key))
-        elif key == current.key:
-            return current
-        elif key < current.key:
-            return self.get_tree_node_by_key_aux(current.left, key)
-        else:  # key > current.key
-            return self.get_tree_node_by_key_aux(current.right, key)
+        """
+            Walks down from current to the node with the given key.
+            :complexity best: O(CompK) the key is at current
+            :complexity worst: O(CompK * D) where D is the depth of the subtree
+        """
+        while current is not None:
+            if key == current.key:
+                return current
+            elif key < current.key:
+                current = current.left
+            else:  # key > current.key
+                current = current.right
+        raise KeyError('Key not found: {0}'.format(key))
 
     def __setitem__(self, key: K, item: I) -> None:
         self.root = self.insert_aux(self.root, key, item)
@@ -88,17 +196,30 @@ class BinarySearchTree(Generic[K, I]):
             where D is the depth of the tree
             CompK is the complexity of comparing the keys
         """
-        if current is None:  # base case: at the leaf
-            current = TreeNode(key, item=item)
+        if current is None:  # empty subtree: the new node is its root
             self.length += 1
-        elif key < current.key:
-            current.left = self.insert_aux(current.left, key, item)
-            current.subtree_size += 1
-        elif key > current.key:
-            current.right = self.insert_aux(current.right, key, item)
-            current.subtree_size += 1
-        else:  # key == current.key
-            raise ValueError('Inserting duplicate item')
+            return TreeNode(key, item=item)
+
+        # walk down to the parent of the new node, remembering the path
+        path = []
+        node = current
+        while node is not None:
+            path.append(node)
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                node = node.right
+            else:  # key == node.key
+                raise ValueError('Inserting duplicate item')
+
+        parent = path[-1]
+        if key < parent.key:
+            parent.left = TreeNode(key, item=item)
+        else:
+            parent.right = TreeNode(key, item=item)
+        for node in path:
+            node.subtree_size += 1
+        self.length += 1
         return current
 
 
@@ -109,34 +230,40 @@ class BinarySearchTree(Generic[K, I]):
         """
             Attempts to delete an item from the tree, it uses the Key to
             determine the node to delete.
+            :complexity best: O(CompK) deleting a root with at most one child
+            :complexity worst: O(CompK * D) where D is the depth of the tree
         """
-
-        if current is None:  # key not found
+        # walk down to the node to delete, remembering the path
+        path = []
+        node = current
+        while node is not None and key != node.key:
+            path.append(node)
+            node = node.left if key < node.key else node.right
+        if node is None:  # key not found
             raise ValueError('Deleting non-existent item')
-        elif key < current.key:
-            current.left  = self.delete_aux(current.left, key)
-            current.subtree_size -= 1
-        elif key > current.key:
-            current.right = self.delete_aux(current.right, key)
-            current.subtree_size -= 1
-        else:  # we found our key => do actual deletion
-            if self.is_leaf(current):
-                self.length -= 1
-                return None
-            elif current.left is None:
-                self.length -= 1
-                return current.right
-            elif current.right is None:
-                self.length -= 1
-                return current.left
-
-            # general case => find a successor
-            succ = self.get_successor(current)
-            current.key  = succ.key
-            current.item = succ.item
-            current.right = self.delete_aux(current.right, succ.key)
-            current.subtree_size -= 1
 
+        if node.left is not None and node.right is not None:
+            # general case => move the successor up, and delete its node instead
+            path.append(node)
+            succ = node.right
+            while succ.left is not None:
+                path.append(succ)
+                succ = succ.left
+            node.key = succ.key
+            node.item = succ.item
+            node = succ
+
+        # node has at most one child, which takes its place
+        child = node.left if node.left is not None else node.right
+        if not path:
+            current = child
+        elif path[-1].left is node:
+            path[-1].left = child
+        else:
+            path[-1].right = child
+        for ancestor in path:
+            ancestor.subtree_size -= 1
+        self.length -= 1
         return current
 
     def get_successor(self, current: TreeNode) -> TreeNode|None:
@@ -183,10 +310,9 @@ class BinarySearchTree(Generic[K, I]):
 
         if current is None:
             return None
-        elif current.left is None:
-            return current
-        else:
-            return self.get_minimal(current.left)
+        while current.left is not None:
+            current = current.left
+        return current
 
     def is_leaf(self, current: TreeNode) -> bool:
         """ Simple check whether or not the node is a leaf. """
@@ -237,7 +363,7 @@ class BinarySearchTree(Generic[K, I]):
             while current is not None:
                 stack.append(current)
                 current = current.left
-            if stack is not None:
+            if stack:
                 current = stack.pop()
                 count +=1
 
@@ -249,3 +375,40 @@ class BinarySearchTree(Generic[K, I]):
 
         return None
 
+    def select(self, k: int) -> TreeNode | None:
+        """
+        Finds the node with the kth smallest key in the tree, counting from 1,
+        or None if k is out of range. The subtree sizes tell at each node whether
+        the kth key is to the left, at the node, or to the right.
+        :complexity: O(D) where D is the depth of the tree
+        """
+        current = self.root
+        while current is not None:
+            left_size = 0 if current.left is None else current.left.subtree_size
+            if k <= left_size:
+                current = current.left
+            elif k == left_size + 1:
+                return current
+            else:
+                k -= left_size + 1
+                current = current.right
+        return None
+
+    def rank(self, key: K) -> int:
+        """
+        Returns the number of keys in the tree smaller than key, which need not be in the tree.
+        For a key in the tree, select(rank(key) + 1) is its node.
+        :complexity: O(CompK * D) where D is the depth of the tree
+        """
+        rank = 0
+        current = self.root
+        while current is not None:
+            left_size = 0 if current.left is None else current.left.subtree_size
+            if key < current.key:
+                current = current.left
+            elif key > current.key:
+                rank += left_size + 1
+                current = current.right
+            else:  # key == current.key
+                return rank + left_size
+        return rank
@@ -3,22 +3,61 @@ from __future__ import annotations
 __author__ = "Brendon Taylor, modified by Jackson Goerner"
 __docformat__ = 'reStructuredText'
 
-from typing import Generic
+from typing import Generic, Iterable
 from referential_array import ArrayR, T
 
 
 class MaxHeap(Generic[T]):
     MIN_CAPACITY = 1
 
-    def __init__(self, max_size: int) -> None:
+    def __init__(self, max_size: int, growable: bool = False, shrink: bool = False) -> None:
+        """
+        Creates an empty heap.
+        A bounded heap holds at most max_size elements. A growable heap uses max_size as
+        its initial capacity and doubles it whenever it fills up; if shrink is also set,
+        the capacity is halved once the heap drains to a quarter of it.
+        :raises ValueError: if shrink is set on a bounded heap, whose capacity is max_size
+        :complexity: O(max_size) to allocate the array
+        """
+        if shrink and not growable:
+            raise ValueError("Only a growable heap can shrink")
         self.length = 0
+        self.growable = growable
+        self.shrink = shrink
         self.the_array = ArrayR(max(self.MIN_CAPACITY, max_size) + 1)
 
+    @classmethod
+    def heapify(cls, items: Iterable[T], max_size: int = 0, growable: bool = False, shrink: bool = False) -> MaxHeap[T]:
+        """
+        Builds a heap holding all the given items, bottom-up.
+        The heap can hold max(max_size, number of items) elements, unless it is growable.
+        :complexity: O(n * CompT) where n is the number of items, since sinking
+        every internal node, starting from the last one, does O(n) comparisons in total.
+        """
+        items = list(items)
+        heap = cls(max(max_size, len(items)), growable, shrink)
+        heap.the_array.array[1:len(items) + 1] = items
+        heap.length = len(items)
+        for k in range(heap.length // 2, 0, -1):
+            heap.sink(k)
+        return heap
+
     def __len__(self) -> int:
         return self.length
 
     def is_full(self) -> bool:
-        return self.length + 1 == len(self.the_array)
+        """ A growable heap is never full. """
+        return not self.growable and self.length + 1 == len(self.the_array)
+
+    def resize(self, capacity: int) -> None:
+        """
+        Moves the elements into a new array able to hold capacity elements.
+        :pre: self.length <= capacity
+        :complexity: O(capacity)
+        """
+        new_array = ArrayR(max(self.MIN_CAPACITY, capacity) + 1)
+        new_array.array[1:self.length + 1] = self.the_array.array[1:self.length + 1]
+        self.the_array = new_array
 
     def rise(self, k: int) -> None:
         """
@@ -34,9 +73,12 @@ class MaxHeap(Generic[T]):
     def add(self, element: T) -> bool:
         """
         Swaps elements while rising
+        :complexity: O(log(n) * CompT), amortised when the heap is growable
         """
-        if self.is_full():
-            raise IndexError
+        if self.length + 1 == len(self.the_array):
+            if not self.growable:
+                raise IndexError
+            self.resize(2 * self.length)
 
         self.length += 1
         self.the_array[self.length] = element
@@ -80,14 +122,191 @@ class MaxHeap(Generic[T]):
         if self.length > 0:
             self.the_array[1] = self.the_array[self.length+1]
             self.sink(1)
+        self.the_array[self.length+1] = None
+        self.shrink_if_drained()
         return max_elt
 
+    def peek_max(self) -> T:
+        """ Return the maximum element without removing it from the heap. """
+        if self.length == 0:
+            raise IndexError
+        return self.the_array[1]
+
+    def shrink_if_drained(self) -> None:
+        """
+        Halves the capacity of a shrinking heap once it is less than a quarter full.
+        Only growable heaps shrink, as a bounded heap must keep room for max_size elements.
+        :complexity: O(capacity) when it shrinks, O(1) otherwise
+        """
+        capacity = len(self.the_array) - 1
+        if self.shrink and self.growable and capacity > self.MIN_CAPACITY and 4 * self.length < capacity:
+            self.resize(capacity // 2)
+
+
+class IndexedMaxHeap(MaxHeap[T]):
+    """
+    Max heap whose elements can be changed or removed after being added.
+    add returns a handle for the element; handles[k] is the handle of the element
+    stored at the_array[k], and position maps each handle back to k.
+    """
+
+    def __init__(self, max_size: int, growable: bool = False, shrink: bool = False) -> None:
+        MaxHeap.__init__(self, max_size, growable, shrink)
+        self.handles = ArrayR(len(self.the_array))
+        self.position = {}
+        self.next_handle = 0
+
+    @classmethod
+    def heapify(cls, items: Iterable[T], max_size: int = 0, growable: bool = False, shrink: bool = False) -> IndexedMaxHeap[T]:
+        """
+        Builds a heap holding all the given items, bottom-up.
+        The i-th item (counting from 0) gets handle i.
+        :complexity: O(n * CompT) where n is the number of items
+        """
+        items = list(items)
+        heap = cls(max(max_size, len(items)), growable, shrink)
+        heap.the_array.array[1:len(items) + 1] = items
+        heap.handles.array[1:len(items) + 1] = list(range(len(items)))
+        heap.position = {handle: handle + 1 for handle in range(len(items))}
+        heap.next_handle = heap.length = len(items)
+        for k in range(heap.length // 2, 0, -1):
+            heap.sink(k)
+        return heap
+
+    def __contains__(self, handle: int) -> bool:
+        return handle in self.position
+
+    def resize(self, capacity: int) -> None:
+        handles = self.handles
+        MaxHeap.resize(self, capacity)
+        self.handles = ArrayR(len(self.the_array))
+        self.handles.array[1:self.length + 1] = handles.array[1:self.length + 1]
+
+    def place(self, k: int, element: T, handle: int) -> None:
+        """ Store element and its handle at index k. """
+        self.the_array[k] = element
+        self.handles[k] = handle
+        self.position[handle] = k
+
+    def rise(self, k: int) -> None:
+        """
+        Rise element at index k to its correct position, keeping position up to date.
+        :pre: 1 <= k <= self.length
+        """
+        item = self.the_array[k]
+        handle = self.handles[k]
+        while k > 1 and item > self.the_array[k // 2]:
+            self.place(k, self.the_array[k // 2], self.handles[k // 2])
+            k = k // 2
+        self.place(k, item, handle)
+
+    def sink(self, k: int) -> None:
+        """
+        Make the element at index k sink to the correct position, keeping position up to date.
+        :pre: 1 <= k <= self.length
+        :complexity: O(log(n) * CompT)
+        """
+        item = self.the_array[k]
+        handle = self.handles[k]
+
+        while 2 * k <= self.length:
+            max_child = self.largest_child(k)
+            if self.the_array[max_child] <= item:
+                break
+            self.place(k, self.the_array[max_child], self.handles[max_child])
+            k = max_child
+
+        self.place(k, item, handle)
+
+    def add(self, element: T) -> int:
+        """
+        Adds the element and returns its handle.
+        :complexity: O(log(n) * CompT), amortised when the heap is growable
+        """
+        if self.length + 1 == len(self.the_array):
+            if not self.growable:
+                raise IndexError
+            self.resize(2 * self.length)
+
+        handle = self.next_handle
+        self.next_handle += 1
+        self.length += 1
+        self.place(self.length, element, handle)
+        self.rise(self.length)
+        return handle
+
+    def get(self, handle: int) -> T:
+        """ Returns the element with the given handle. """
+        return self.the_array[self.position[handle]]
+
+    def max_handle(self) -> int:
+        """ Returns the handle of the maximum element. """
+        if self.length == 0:
+            raise IndexError
+        return self.handles[1]
+
+    def get_max(self) -> T:
+        """ Remove (and return) the maximum element from the heap. """
+        return self.remove(self.max_handle())
+
+    def remove(self, handle: int) -> T:
+        """
+        Removes (and returns) the element with the given handle.
+        :raises KeyError: if the handle is not in the heap
+        :complexity: O(log(n) * CompT)
+        """
+        k = self.position.pop(handle)
+        element = self.the_array[k]
+        last = self.length
+        self.length -= 1
+        if k != last:
+            self.place(k, self.the_array[last], self.handles[last])
+            if k > 1 and self.the_array[k] > self.the_array[k // 2]:
+                self.rise(k)
+            else:
+                self.sink(k)
+        self.the_array[last] = None
+        self.handles[last] = None
+        self.shrink_if_drained()
+        return element
+
+    def increase_key(self, handle: int, element: T) -> None:
+        """
+        Replaces the element with the given handle by a larger (or equal) one.
+        :raises ValueError: if element is smaller than the current one
+        :complexity: O(log(n) * CompT)
+        """
+        k = self.position[handle]
+        if element < self.the_array[k]:
+            raise ValueError('New key is smaller than the current key')
+        self.the_array[k] = element
+        self.rise(k)
+
+    def decrease_key(self, handle: int, element: T) -> None:
+        """
+        Replaces the element with the given handle by a smaller (or equal) one.
+        :raises ValueError: if element is larger than the current one
+        :complexity: O(log(n) * CompT)
+        """
+        k = self.position[handle]
+        if element > self.the_array[k]:
+            raise ValueError('New key is larger than the current key')
+        self.the_array[k] = element
+        self.sink(k)
+
+    def update(self, handle: int, element: T) -> None:
+        """
+        Replaces the element with the given handle, whichever way its key moves.
+        :complexity: O(log(n) * CompT)
+        """
+        if element > self.get(handle):
+            self.increase_key(handle, element)
+        else:
+            self.decrease_key(handle, element)
+
 if __name__ == '__main__':
     items = [ int(x) for x in input('Enter a list of numbers: ').strip().split() ]
-    heap = MaxHeap(len(items))
+    heap = MaxHeap.heapify(items)
 
-    for item in items:
-        heap.add(item)
-        
     while(len(heap) > 0):
         print(heap.get_max())
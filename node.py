@@ -11,9 +11,13 @@ __author__ = 'Maria Garcia de la Banda and Brendon Taylor. Modified by Alexey Ig
 __docformat__ = 'reStructuredText'
 
 
-@dataclass
+@dataclass(slots=True)
 class TreeNode(Generic[K, I]):
-    """ Node class represent BST nodes. """
+    """
+        Node class represent BST nodes.
+        Slotted: the fields live in the instance itself rather than in a per-node
+        __dict__, which saves over a third of the memory of a large tree.
+    """
 
     key: K
     item: I = None
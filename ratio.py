@@ -1,18 +1,38 @@
 from __future__ import annotations
 
 import bisect
-from typing import Generic, TypeVar, List, Set
+import random
+from typing import Generic, TypeVar, List, Set, Iterable
 from math import ceil
+from itertools import accumulate, chain, islice, repeat
 from bst import BinarySearchTree
+from balanced_bst import BalancedBinarySearchTree
 from node import TreeNode
+from utils import as_list
 
 T = TypeVar("T")
 I = TypeVar("I")
 
+
+def cut_points(total_number_of_points: int, x, y) -> tuple[int, int]:
+    """
+    Returns the positions among total_number_of_points sorted points between which the points
+    neither in the lowest x% nor in the highest y% lie: the first point not in the lowest x%
+    and the first point in the highest y%.
+    Complexity: O(1)
+    """
+    first_point_position = ceil(total_number_of_points * x / 100)
+    last_point_position = total_number_of_points - ceil(total_number_of_points * y / 100)
+    return first_point_position, last_point_position
+
+
 class Percentiles(Generic[T]):
 
     def __init__(self) -> None:
         self.points = []
+
+    def __len__(self) -> int:
+        return len(self.points)
     
     def add_point(self, item: T):
         """
@@ -43,24 +63,381 @@ class Percentiles(Generic[T]):
             del self.points[point_position]
 
 
+    def add_points(self, items: Iterable[T]):
+        """
+        Adds a batch of points, which may be an array with a tolist method, such as a NumPy
+        array. The batch is appended and the list sorted again: Timsort finds the points
+        already sorted as one run, sorts the batch as others and merges them.
+        Complexity: O(N + M * log(M)) where M is the number of points added.
+        """
+        self.points.extend(as_list(items))
+        self.points.sort()
+
+    def remove_points(self, items: Iterable[T]):
+        """
+        Removes one occurrence of each point of a batch, as remove_point would, ignoring
+        the ones that are not points. The batch is sorted, so each is searched for only
+        after the previous one, and the points kept are copied once, slice by slice.
+        Complexity: O(N + M * log(N)) where M is the number of points in the batch.
+        """
+        points = self.points
+        kept = []
+        start = 0
+        for item in sorted(as_list(items)):
+            point_position = bisect.bisect_left(points, item, start)
+            if point_position < len(points) and points[point_position] == item:
+                kept.append(points[start:point_position])
+                start = point_position + 1
+        if kept:
+            kept.append(points[start:])
+            self.points = list(chain.from_iterable(kept))
+
+    def rank(self, item: T) -> int:
+        """
+        Returns the number of points smaller than item, which need not be a point.
+        Complexity: O(log(N))
+        """
+        return bisect.bisect_left(self.points, item)
+
+    def select(self, k: int) -> T:
+        """
+        Returns the kth smallest point, counting from 1.
+        Complexity: O(1)
+        """
+        if not 1 <= k <= len(self.points):
+            raise IndexError("No point of rank {0}".format(k))
+        return self.points[k - 1]
+
+    def cut_points(self, x, y) -> tuple[int, int]:
+        """
+        Returns the positions in the sorted points between which ratio(x, y) lies: the first
+        point not in the lowest x% and the first point in the highest y%.
+        Complexity: O(1)
+        """
+        return cut_points(len(self), x, y)
+
+    def ratio(self, x, y):
+        """
+        Returns the points that are neither in the lowest x% nor in the highest y%, in
+        increasing order. self.points is always kept sorted, so this is a single slice of it.
+
+        Best Case Complexity: O(1)
+        This occurs when O (the number of points returned by the function) is small, as
+        only the returned points are copied, whatever N (the total number of points).
+
+        Worst Case Complexity: O(O)
+        This occurs when O is close to N.
+        """
+        first_point_position, last_point_position = self.cut_points(x, y)
+        return self.points[first_point_position:last_point_position]
+
+
+class TreePercentiles(Generic[T]):
+    """
+    Percentiles kept in a weight-balanced binary search tree instead of a sorted list, so
+    that adding and removing points does not shift the others. Equal points are told apart
+    by the order they were added in: each point is stored under the key (point, order).
+    Subtree sizes give rank and select, so both cut points of a ratio are found in O(log(N)).
+    It has the methods of Percentiles, but no points list: ratio(0, 0) gives every point.
+    """
+
+    # Batches of at least one point for every REBUILD_RATIO points held are merged by
+    # rebuilding the tree, and smaller ones point by point.
+    REBUILD_RATIO = 10
+
+    def __init__(self) -> None:
+        self.tree = BalancedBinarySearchTree()
+        self.order = 0
+
+    def __len__(self) -> int:
+        return len(self.tree)
+
+    def add_point(self, item: T):
+        """
+        Complexity: O(log(N)) comparisons of points.
+        """
+        self.tree[(item, self.order)] = None
+        self.order += 1
+
+    def remove_point(self, item: T):
+        """
+        Removes one occurrence of item, if it is a point: the first key that is not below
+        (item,) is the lowest key of item, as (item,) sorts before every (item, order).
+        Complexity: O(log(N))
+        """
+        node = self.tree.select(self.tree.rank((item,)) + 1)
+        if node is not None and node.key[0] == item:
+            del self.tree[node.key]
+
+    def add_points(self, items: Iterable[T]):
+        """
+        Adds a batch of points, which may be an array with a tolist method. A large batch
+        is sorted and merged with the keys in order, and the tree built again from them.
+        Complexity: O(M * log(N)) for a small batch, and O(N + M * log(M)) for a large one,
+        where M is the number of points added.
+        """
+        items = as_list(items)
+        if len(items) * self.REBUILD_RATIO < len(self.tree):
+            for item in items:
+                self.add_point(item)
+            return
+        keys = list(self.tree)
+        keys.extend(zip(items, range(self.order, self.order + len(items))))
+        keys.sort()
+        self.order += len(items)
+        self.tree = BalancedBinarySearchTree.from_sorted(zip(keys, repeat(None)))
+
+    def remove_points(self, items: Iterable[T]):
+        """
+        Removes one occurrence of each point of a batch, as remove_point would. For a large
+        batch, the sorted batch is walked beside the keys in order, and the tree built again
+        from the keys left.
+        Complexity: O(M * log(N)) for a small batch, and O(N + M * log(M)) for a large one,
+        where M is the number of points in the batch.
+        """
+        items = as_list(items)
+        if len(items) * self.REBUILD_RATIO < len(self.tree):
+            for item in items:
+                self.remove_point(item)
+            return
+        batch = sorted(items)
+        kept = []
+        i = 0
+        for key in self.tree:
+            while i < len(batch) and batch[i] < key[0]:
+                i += 1
+            if i < len(batch) and batch[i] == key[0]:
+                i += 1  # the lowest key of a point goes first, as in remove_point
+            else:
+                kept.append(key)
+        self.tree = BalancedBinarySearchTree.from_sorted(zip(kept, repeat(None)))
+
+    def rank(self, item: T) -> int:
+        """
+        Returns the number of points smaller than item, which need not be a point.
+        Complexity: O(log(N))
+        """
+        return self.tree.rank((item,))
+
+    def select(self, k: int) -> T:
+        """
+        Returns the kth smallest point, counting from 1.
+        Complexity: O(log(N))
+        """
+        node = self.tree.select(k)
+        if node is None:
+            raise IndexError("No point of rank {0}".format(k))
+        return node.key[0]
+
+    def cut_points(self, x, y) -> tuple[int, int]:
+        """
+        Returns the positions in the sorted points between which ratio(x, y) lies, as
+        Percentiles.cut_points does.
+        Complexity: O(1)
+        """
+        return cut_points(len(self), x, y)
+
+    def ratio(self, x, y):
+        """
+        Returns the points that are neither in the lowest x% nor in the highest y%, in
+        increasing order. The first point is found by select, and the others by walking
+        the tree in order from it.
+
+        Best Case Complexity: O(log(N))
+        This occurs when O (the number of points returned by the function) is small.
+
+        Worst Case Complexity: O(log(N) + O)
+        This occurs when O is close to N.
+        """
+        first_point_position, last_point_position = self.cut_points(x, y)
+        if first_point_position >= last_point_position:
+            return []
+        first_key = self.tree.select(first_point_position + 1).key
+        keys = islice(self.tree.range(first_key), last_point_position - first_point_position)
+        return [key[0] for key, _ in keys]
+
+
+class ApproximatePercentiles(Generic[T]):
+    """
+    Percentiles estimated from a KLL sketch (Karnin, Lang and Liberty, 2016), for streams of
+    points too long to keep. The sketch is a stack of compactors: level h holds points that
+    each stand for 2**h of the points added. When a level is full it is sorted and every
+    other point, starting at random from the first or the second, moves up a level. The
+    capacity of a level is k times (2/3) to the power of its distance from the top, so the
+    sketch holds fewer than 3k + 2 log2(N) points whatever the number N of points added.
+
+    Ranks, and so percentiles and the cut points of ratio, are off by at most about 2 N / k
+    in practice (see benchmarks/bench_ratio.py): 1% of N for the default k of 200.
+    Sketches of the same stream split across workers can be merged into one. Unlike
+    Percentiles, points cannot be removed, as the sketch keeps too little to forget one.
+    """
+
+    SHRINK = 2 / 3
+
+    def __init__(self, k: int = 200, seed=None) -> None:
+        if k < 2:
+            raise ValueError("k must be at least 2, not {0}".format(k))
+        self.k = k
+        self.random = random.Random(seed)
+        self.compactors = [[]]
+        self.count = 0
+        self.size = 0
+        self.max_size = self.capacity(0)
+        self.view = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def capacity(self, level: int) -> int:
+        """
+        Returns the number of points level can hold before it is compacted.
+        Complexity: O(1)
+        """
+        depth = len(self.compactors) - level - 1
+        return int(ceil(self.SHRINK ** depth * self.k)) + 1
+
+    def retained(self) -> int:
+        """
+        Returns the number of points the sketch holds.
+        Complexity: O(1)
+        """
+        return self.size
+
+    def add_point(self, item: T):
+        """
+        Best Case Complexity: O(1)
+        This occurs when the bottom level is not full.
+
+        Worst Case Complexity: O(k * log(k))
+        This occurs when a level is full and is sorted to be compacted, which happens
+        once in about k additions, so adding a point is O(log(k)) amortised.
+        """
+        self.compactors[0].append(item)
+        self.count += 1
+        self.size += 1
+        self.view = None
+        if self.size >= self.max_size:
+            self.compress()
+
+    def add_points(self, items: Iterable[T]):
+        """
+        Adds a batch of points, which may be an array with a tolist method, at the bottom
+        level at once, and then compacts as merge does.
+        Complexity: O(M * log(M)) where M is the number of points added.
+        """
+        items = as_list(items)
+        self.compactors[0].extend(items)
+        self.count += len(items)
+        self.size += len(items)
+        self.view = None
+        while self.size >= self.max_size:
+            self.compress()
+
+    def merge(self, other: ApproximatePercentiles[T]):
+        """
+        Adds all of the points of other to this sketch, as if they had been added here.
+        Complexity: O(S * log(S)) where S is the number of points both sketches hold.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.grow()
+        for compactor, other_compactor in zip(self.compactors, other.compactors):
+            compactor.extend(other_compactor)
+        self.count += other.count
+        self.size += other.size
+        self.view = None
+        while self.size >= self.max_size:
+            self.compress()
+
+    def grow(self):
+        """
+        Adds a level at the top, lowering the capacity of the others.
+        Complexity: O(log(N))
+        """
+        self.compactors.append([])
+        self.max_size = sum(self.capacity(level) for level in range(len(self.compactors)))
+
+    def compress(self):
+        """
+        Compacts the lowest full level.
+        Complexity: O(C * log(C)) where C is the number of points in that level.
+        """
+        for level, compactor in enumerate(self.compactors):
+            if len(compactor) >= self.capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.grow()
+                compactor.sort()
+                # An odd point out stays at this level, so that every point moved up
+                # replaces exactly two.
+                end = len(compactor) - len(compactor) % 2
+                promoted = compactor[self.random.randint(0, 1):end:2]
+                del compactor[:end]
+                self.compactors[level + 1].extend(promoted)
+                self.size -= len(promoted)
+                return
+
+    def weighted_points(self) -> tuple[list, list]:
+        """
+        Returns the points the sketch holds in increasing order, and the estimated rank of
+        each, followed by N: point i stands for the points of ranks ranks[i] to ranks[i+1] - 1.
+        The result is cached until the next point is added.
+        Complexity: O(S * log(S)) where S is the number of points the sketch holds.
+        """
+        if self.view is None:
+            pairs = sorted((item, 1 << level) for level, compactor in enumerate(self.compactors)
+                           for item in compactor)
+            points = [item for item, _ in pairs]
+            ranks = list(accumulate((weight for _, weight in pairs), initial=0))
+            self.view = points, ranks
+        return self.view
+
+    def rank(self, item: T) -> int:
+        """
+        Returns the estimated number of points smaller than item.
+        Complexity: O(log(S)) once weighted_points is cached.
+        """
+        points, ranks = self.weighted_points()
+        return ranks[bisect.bisect_left(points, item)]
+
+    def select(self, k: int) -> T:
+        """
+        Returns the estimated kth smallest point, counting from 1.
+        Complexity: O(log(S)) once weighted_points is cached.
+        """
+        if not 1 <= k <= self.count:
+            raise IndexError("No point of rank {0}".format(k))
+        points, ranks = self.weighted_points()
+        return points[bisect.bisect_left(ranks, k, 1) - 1]
+
+    def quantile(self, q: float) -> T:
+        """
+        Returns the estimated point below which a fraction q of the points lie, for
+        0 <= q <= 1: the point of rank ceil(q * N), or the smallest point for q = 0.
+        Complexity: O(log(S)) once weighted_points is cached.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile {0} is not between 0 and 1".format(q))
+        return self.select(max(1, ceil(q * self.count)))
+
+    def percentile(self, p: float) -> T:
+        """
+        Returns the estimated pth percentile, for 0 <= p <= 100.
+        Complexity: see quantile
+        """
+        return self.quantile(p / 100)
+
     def ratio(self, x, y):
         """
-        Best Case Complexity: O(N * log(N))
-        This occurs when N (the total number of points currently in the Percentile object)
-        is small and O (the number of points returned by the function) is small in comparison
-        to N.
-
-        Worst Case Complexity: O(N * log(N) + O)
-        This occurs when N (the total number of points currently in the Percentile object)
-        is large and O (the number of points returned by the function) is close to N.
-        """
-        total_number_of_points = len(self.points)
-        first_point_position = ceil(total_number_of_points * x / 100)
-        # first_point_position is the position of the first point in the list of sorted points
-        last_point_position = total_number_of_points - ceil(total_number_of_points * y / 100)
-        # last_point_position is the position of the last point in the list of sorted points
-        sorted_points = sorted(self.points)
-        return sorted_points[first_point_position:last_point_position]
+        Returns the points the sketch holds whose estimated ranks are neither in the lowest
+        x% nor in the highest y%, in increasing order: a sample of the exact ratio, in which
+        each point stands for as many as it did in the stream.
+        Complexity: O(log(S) + O) once weighted_points is cached, where O is the number of
+        points returned.
+        """
+        first_point_position, last_point_position = cut_points(self.count, x, y)
+        points, ranks = self.weighted_points()
+        first = bisect.bisect_left(ranks, first_point_position, 0, len(points))
+        last = bisect.bisect_left(ranks, last_point_position, 0, len(points))
+        return points[first:last]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+import io
+import random
+import unittest
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+
+from array_bst import ArrayBinarySearchTree, NIL
+from bst import BinarySearchTree
+
+def check(test, tree, current=None):
+    """ Checks subtree sizes and key order below current, and returns the size. """
+    if current is None:
+        current = tree.root
+    if current == NIL:
+        return 0
+    size = 1
+    for child, compare in ((tree.left[current], test.assertLess), (tree.right[current], test.assertGreater)):
+        if child != NIL:
+            compare(tree.keys_array[child], tree.keys_array[current])
+            size += check(test, tree, child)
+    test.assertEqual(tree.subtree_size[current], size)
+    return size
+
+class ArrayBSTTest(unittest.TestCase):
+
+    @timeout()
+    @number("8.1")
+    def test_same_as_bst(self):
+        random.seed(2718)
+        tree, BST = ArrayBinarySearchTree(), BinarySearchTree()
+        for _ in range(3000):
+            key = random.randint(0, 500)
+            if key in BST:
+                self.assertIn(key, tree)
+                self.assertEqual(tree[key], BST[key])
+                del tree[key]
+                del BST[key]
+            else:
+                self.assertNotIn(key, tree)
+                tree[key] = BST[key] = str(key)
+            self.assertEqual(len(tree), len(BST))
+        self.assertEqual(check(self, tree), len(BST))
+        self.assertEqual(list(tree.items()), list(BST.items()))
+        self.assertEqual(list(reversed(tree)), list(reversed(BST)))
+        self.assertEqual(list(tree.range(100, 300)), list(BST.range(100, 300)))
+        self.assertEqual(list(tree.range(max(BST) + 1, max(BST) + 100)), [])
+        self.assertEqual(list(tree.range(max(BST) + 1)), [])
+        self.assertEqual(list(ArrayBinarySearchTree().range(0)), [])
+        for k in range(len(BST) + 2):
+            node = BST.select(k)
+            self.assertEqual(tree.select(k), None if node is None else (node.key, node.item))
+        self.assertEqual([tree.rank(key) for key in range(-1, 502)], [BST.rank(key) for key in range(-1, 502)])
+        # slots freed by deletions are reused before the arrays grow
+        self.assertLessEqual(len(tree.keys_array), 501)
+
+        tree_drawing, bst_drawing = io.StringIO(), io.StringIO()
+        tree.draw(tree_drawing)
+        BST.draw(bst_drawing)
+        self.assertEqual(tree_drawing.getvalue(), bst_drawing.getvalue())
+
+        self.assertRaises(KeyError, tree.__getitem__, 1000)
+        self.assertRaises(ValueError, tree.__delitem__, 1000)
+        self.assertRaises(ValueError, tree.__setitem__, next(iter(tree)), 'again')
+
+    @timeout()
+    @number("8.2")
+    def test_bulk_build(self):
+        tree = ArrayBinarySearchTree.from_unsorted(((key / 4, key) for key in range(999, -1, -1)), typecode='d')
+        self.assertEqual(check(self, tree), 1000)
+        self.assertEqual(list(tree.keys()), [key / 4 for key in range(1000)])
+        self.assertEqual(tree[12.25], 49)
+        del tree[12.25]
+        tree[0.1] = 'new'
+        self.assertEqual(check(self, tree), 1000)
+        self.assertEqual(tree.select(2), (0.1, 'new'))
+        self.assertRaises(ValueError, ArrayBinarySearchTree.from_sorted, [(2, 'b'), (1, 'a')])
+        self.assertTrue(ArrayBinarySearchTree().is_empty())
@@ -0,0 +1,75 @@
+import io
+import math
+import random
+import unittest
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+
+from balanced_bst import BalancedBinarySearchTree
+
+def check(test, node):
+    """ Checks subtree sizes, key order and weight balance, and returns (size, height). """
+    if node is None:
+        return 0, 0
+    left_size, left_height = check(test, node.left)
+    right_size, right_height = check(test, node.right)
+    test.assertEqual(node.subtree_size, left_size + right_size + 1)
+    if node.left is not None:
+        test.assertLess(node.left.key, node.key)
+    if node.right is not None:
+        test.assertGreater(node.right.key, node.key)
+    test.assertLessEqual(left_size + 1, BalancedBinarySearchTree.DELTA * (right_size + 1))
+    test.assertLessEqual(right_size + 1, BalancedBinarySearchTree.DELTA * (left_size + 1))
+    return node.subtree_size, 1 + max(left_height, right_height)
+
+class BalancedBSTTest(unittest.TestCase):
+
+    @timeout()
+    @number("7.1")
+    def test_sorted_keys(self):
+        BST = BalancedBinarySearchTree()
+        for key in range(4000):
+            BST[key] = str(key)
+        size, height = check(self, BST.root)
+        self.assertEqual(size, 4000)
+        self.assertLessEqual(height, 2.5 * math.log2(4000))
+        self.assertEqual(BST.kth_smallest(1234, BST.root).key, 1233)
+        self.assertEqual(BST[3999], '3999')
+        self.assertIn(0, BST)
+        self.assertRaises(ValueError, BST.__setitem__, 17, 'again')
+
+        for key in range(0, 4000, 3):
+            del BST[key]
+        size, height = check(self, BST.root)
+        self.assertEqual(size, len(BST))
+        self.assertNotIn(3, BST)
+        self.assertRaises(ValueError, BST.__delitem__, 3)
+
+    @timeout()
+    @number("7.2")
+    def test_random_updates(self):
+        random.seed(71222)
+        BST, expected = BalancedBinarySearchTree(), {}
+        for _ in range(3000):
+            key = random.randint(0, 500)
+            if key in expected:
+                del BST[key]
+                del expected[key]
+            else:
+                BST[key] = expected[key] = random.random()
+        self.assertEqual(check(self, BST.root)[0], len(expected))
+        for key, item in expected.items():
+            self.assertEqual(BST[key], item)
+
+        drawing = io.StringIO()
+        BST.draw(to=drawing)
+        self.assertEqual(drawing.getvalue().splitlines()[0], str(BST.root.key))
+
+    @timeout()
+    @number("7.3")
+    def test_from_sorted(self):
+        BST = BalancedBinarySearchTree.from_sorted((key, key) for key in range(1000))
+        self.assertIsInstance(BST, BalancedBinarySearchTree)
+        for key in range(1000, 1500):
+            BST[key] = key
+        self.assertEqual(check(self, BST.root)[0], 1500)
@@ -103,6 +103,7 @@ class TestBalancing(unittest.TestCase):
         ]
         new_ordering = make_ordering(points[:])
         self.assertSetEqual(set(points), set(new_ordering))
+        self.assertEqual(len(new_ordering), len(points))
 
     @timeout()
     @number("4.2")
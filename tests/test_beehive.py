@@ -1,8 +1,9 @@
+import random
 import unittest
 from ed_utils.decorators import number, visibility
 from ed_utils.timeout import timeout
 
-from beehive import BeehiveSelector, Beehive
+from beehive import BeehiveSelector, Beehive, BeehiveTree, SpatialBeehiveSelector
 
 class TestBeehiveSelector(unittest.TestCase):
 
@@ -47,3 +48,144 @@ class TestBeehiveSelector(unittest.TestCase):
         for actual, ex in zip(all_emeralds, expected):
             self.assertAlmostEqual(actual, ex, 0)
         
+
+    @timeout()
+    @number("5.2")
+    def test_matches_linear_scan(self):
+        random.seed(5123)
+        hives = [
+            Beehive(i, i, i, capacity=random.randint(1, 10), nutrient_factor=random.randint(1, 5), volume=random.randint(0, 30))
+            for i in range(60)
+        ]
+        copies = [Beehive(h.x, h.y, h.z, h.capacity, h.nutrient_factor, h.volume) for h in hives]
+        s = BeehiveSelector(50)
+        s.set_all_beehives(hives)
+        # Reference: the original linear scan, picking the first hive with the strictly greatest yield.
+        reference = copies[:50]
+        for _ in range(200):
+            best, best_hive = 0.0, None
+            for hive in reference:
+                emeralds = min(hive.capacity, hive.volume) * hive.nutrient_factor
+                if emeralds > best:
+                    best, best_hive = emeralds, hive
+            if best_hive is not None:
+                best_hive.volume -= min(best_hive.capacity, best_hive.volume)
+            self.assertEqual(s.harvest_best_beehive(), best)
+        self.assertEqual([h.volume for h in hives], [h.volume for h in copies])
+
+    @timeout()
+    @number("5.3")
+    def test_update_and_remove(self):
+        s = BeehiveSelector(5)
+        b1 = Beehive(1, 1, 1, capacity=10, nutrient_factor=2, volume=10)
+        b2 = Beehive(2, 2, 2, capacity=10, nutrient_factor=3, volume=10)
+        b3 = Beehive(3, 3, 3, capacity=10, nutrient_factor=1, volume=10)
+        s.set_all_beehives([b1, b2])
+        s.add_beehive(b3)
+
+        b3.nutrient_factor = 10
+        s.update_beehive(b3)
+        self.assertEqual(s.harvest_best_beehive(), 100)
+
+        s.remove_beehive(b2)
+        b1.volume = 5
+        s.update_beehive(b1)
+        self.assertEqual(s.harvest_best_beehive(), 10)
+        self.assertEqual(s.harvest_best_beehive(), 0.0)
+        self.assertRaises(KeyError, s.remove_beehive, b2)
+
+        # a hive has a single entry, so adding it again would orphan the first one
+        self.assertRaises(ValueError, s.add_beehive, b1)
+        self.assertRaises(ValueError, s.set_all_beehives, [b1, b2, b1])
+        s.remove_beehive(b1)
+        s.add_beehive(b1)
+        s.remove_beehive(b1)
+        self.assertEqual(s.harvest_many(3), [0.0, 0.0, 0.0])
+
+    @timeout()
+    @number("5.4")
+    def test_harvest_many(self):
+        random.seed(99812)
+        hives = [
+            Beehive(i, i, i, capacity=random.randint(1, 10), nutrient_factor=random.randint(1, 5), volume=random.randint(0, 60))
+            for i in range(40)
+        ]
+        copies = [Beehive(h.x, h.y, h.z, h.capacity, h.nutrient_factor, h.volume) for h in hives]
+        single, batched = BeehiveSelector(40), BeehiveSelector(40)
+        single.set_all_beehives(hives)
+        batched.set_all_beehives(copies)
+
+        expected = [single.harvest_best_beehive() for _ in range(400)]
+        actual = batched.harvest_many(150) + batched.harvest_many(0) + batched.harvest_many(250)
+        self.assertEqual(actual, expected)
+        self.assertEqual([h.volume for h in hives], [h.volume for h in copies])
+        self.assertEqual(BeehiveSelector(3).harvest_many(2), [0.0, 0.0])
+
+        # float stats, as harvest_best_beehive accepts them
+        hives = [Beehive(i, i, i, capacity=0.1 * (i + 1), nutrient_factor=1.5, volume=0.3 * (i + 2)) for i in range(5)]
+        copies = [Beehive(h.x, h.y, h.z, h.capacity, h.nutrient_factor, h.volume) for h in hives]
+        single, batched = BeehiveSelector(5), BeehiveSelector(5)
+        single.set_all_beehives(hives)
+        batched.set_all_beehives(copies)
+        self.assertEqual(batched.harvest_many(40), [single.harvest_best_beehive() for _ in range(40)])
+        self.assertEqual([h.volume for h in hives], [h.volume for h in copies])
+
+    @timeout()
+    @number("5.5")
+    def test_spatial(self):
+        random.seed(40321)
+        hives = [
+            Beehive(random.randint(0, 20), random.randint(0, 20), random.randint(0, 20),
+                    capacity=random.randint(1, 10), nutrient_factor=random.randint(1, 5), volume=random.randint(0, 40))
+            for _ in range(300)
+        ]
+        copies = [Beehive(h.x, h.y, h.z, h.capacity, h.nutrient_factor, h.volume) for h in hives]
+        plain, spatial = BeehiveSelector(250), SpatialBeehiveSelector(250)
+        plain.set_all_beehives(hives)
+        spatial.set_all_beehives(copies)
+        for _ in range(100):
+            self.assertEqual(spatial.harvest_best_beehive(), plain.harvest_best_beehive())
+        self.assertEqual([h.volume for h in hives], [h.volume for h in copies])
+
+        def brute_force(inside):
+            best, best_hive = 0.0, None
+            for hive in copies[:250]:
+                emeralds = min(hive.capacity, hive.volume) * hive.nutrient_factor
+                if inside(hive) and emeralds > best:
+                    best, best_hive = emeralds, hive
+            return best, best_hive
+
+        for _ in range(100):
+            lo = tuple(random.randint(0, 20) for _ in range(3))
+            hi = tuple(c + random.randint(0, 8) for c in lo)
+            expected, hive = brute_force(lambda h: all(l <= c <= u for l, c, u in zip(lo, (h.x, h.y, h.z), hi)))
+            volume = hive.volume if hive else None
+            self.assertEqual(spatial.harvest_best_in_box(lo, hi), expected)
+            if hive:
+                self.assertLess(hive.volume, volume)
+
+            centre, radius = tuple(random.randint(0, 20) for _ in range(3)), random.randint(0, 6)
+            expected, _ = brute_force(lambda h: (h.x - centre[0]) ** 2 + (h.y - centre[1]) ** 2 + (h.z - centre[2]) ** 2 <= radius ** 2)
+            self.assertEqual(spatial.harvest_best_in_radius(centre, radius), expected)
+
+        # hives in order along a line are loaded as a balanced tree, not a chain
+        line = [Beehive(i, i, i, capacity=5, nutrient_factor=i % 7, volume=10) for i in range(3000)]
+        copies = [Beehive(h.x, h.y, h.z, h.capacity, h.nutrient_factor, h.volume) for h in line]
+        plain, spatial = BeehiveSelector(3000), SpatialBeehiveSelector(3000)
+        plain.set_all_beehives(line)
+        spatial.set_all_beehives(copies)
+        self.assertEqual(len(spatial), 3000)
+        for _ in range(50):
+            self.assertEqual(spatial.harvest_best_beehive(), plain.harvest_best_beehive())
+
+        # rebuilds, to rebalance or after deletions, fill the best entries in again
+        spatial.tree.rebuild()
+        balanced = SpatialBeehiveSelector(3000)
+        balanced.tree = BeehiveTree(balance_ratio=7)
+        for hive in [Beehive(h.x, h.y, h.z, h.capacity, h.nutrient_factor, h.volume) for h in copies]:
+            balanced.add_beehive(hive)
+        self.assertGreater(balanced.tree.rebuilds, 0)
+        for _ in range(50):
+            expected = plain.harvest_best_beehive()
+            self.assertEqual(spatial.harvest_best_beehive(), expected)
+            self.assertEqual(balanced.harvest_best_beehive(), expected)
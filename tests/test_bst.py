@@ -1,8 +1,11 @@
+import gc
+import random
 import unittest
 from ed_utils.decorators import number, visibility
 from ed_utils.timeout import timeout
 
 from bst import BinarySearchTree
+from node import TreeNode
 
 class BSTTest(unittest.TestCase):
 
@@ -77,3 +80,131 @@ class BSTTest(unittest.TestCase):
         kth = BST.kth_smallest(5, BST.root)
         self.assertEqual(kth.key, 95)
         self.assertEqual(kth.item, 1)
+
+    @timeout()
+    @number("1.4")
+    def test_deep_tree(self):
+        BST = BinarySearchTree()
+        for key in range(5000):
+            BST[key] = key * 2
+        self.assertEqual(len(BST), 5000)
+        self.assertEqual(BST[4999], 9998)
+        self.assertEqual(BST.get_minimal(BST.root).key, 0)
+        for key in range(0, 5000, 2):
+            del BST[key]
+        self.assertEqual(len(BST), 2500)
+        self.assertEqual(BST.root.subtree_size, 2500)
+        self.assertNotIn(4998, BST)
+        self.assertRaises(ValueError, BST.__setitem__, 4999, 0)
+        self.assertRaises(ValueError, BST.__delitem__, 4998)
+
+    @timeout()
+    @number("1.5")
+    def test_random_updates(self):
+        random.seed(300129)
+        BST, expected = BinarySearchTree(), {}
+
+        def check_sizes(node):
+            if node is None:
+                return 0
+            size = 1 + check_sizes(node.left) + check_sizes(node.right)
+            self.assertEqual(node.subtree_size, size)
+            return size
+
+        for _ in range(2000):
+            key = random.randint(0, 300)
+            if key in expected:
+                del BST[key]
+                del expected[key]
+            else:
+                BST[key] = expected[key] = random.random()
+        self.assertEqual(check_sizes(BST.root), len(expected))
+        self.assertEqual(len(BST), len(expected))
+        for key, item in expected.items():
+            self.assertEqual(BST[key], item)
+
+    @timeout()
+    @number("1.6")
+    def test_select_rank(self):
+        random.seed(41891)
+        BST = BinarySearchTree()
+        keys = random.sample(range(0, 10000, 2), 1000)
+        for key in keys:
+            BST[key] = -key
+        keys.sort()
+        for k, key in enumerate(keys, start=1):
+            self.assertEqual(BST.select(k).key, key)
+            self.assertEqual(BST.rank(key), k - 1)
+            self.assertEqual(BST.rank(key + 1), k)
+        self.assertEqual(BST.rank(-1), 0)
+        self.assertIsNone(BST.select(0))
+        self.assertIsNone(BST.select(1001))
+        self.assertIsNone(BST.kth_smallest(1001, BST.root))
+
+    @timeout()
+    @number("1.7")
+    def test_iteration(self):
+        random.seed(5543)
+        BST = BinarySearchTree()
+        keys = random.sample(range(1000), 300)
+        for key in keys:
+            BST[key] = str(key)
+        keys.sort()
+        self.assertEqual(list(BST), keys)
+        self.assertEqual(list(BST.keys()), keys)
+        self.assertEqual(list(reversed(BST)), keys[::-1])
+        self.assertEqual(list(BST.items()), [(key, str(key)) for key in keys])
+        for _ in range(50):
+            lo = random.randint(-10, 1010)
+            hi = lo + random.randint(0, 200)
+            self.assertEqual(list(BST.range(lo, hi)), [(key, str(key)) for key in keys if lo <= key < hi])
+        self.assertEqual(list(BST.range(keys[-1] + 1, keys[-1] + 100)), [])
+        self.assertEqual(list(BST.range(keys[-1] + 1)), [])
+        self.assertEqual(list(BinarySearchTree().range(0)), [])
+        self.assertEqual(list(BinarySearchTree()), [])
+
+    @timeout()
+    @number("1.8")
+    def test_bulk_build(self):
+        random.seed(9982)
+        keys = random.sample(range(100000), 5000)
+        BST = BinarySearchTree.from_unsorted((key, -key) for key in keys)
+        self.assertEqual(len(BST), 5000)
+        self.assertEqual(list(BST.items()), [(key, -key) for key in sorted(keys)])
+
+        def check(node):
+            if node is None:
+                return 0, 0
+            (left_size, left_height), (right_size, right_height) = check(node.left), check(node.right)
+            self.assertEqual(node.subtree_size, left_size + right_size + 1)
+            self.assertLessEqual(abs(left_size - right_size), 1)
+            return node.subtree_size, 1 + max(left_height, right_height)
+
+        self.assertEqual(check(BST.root), (5000, 13))
+        BST[100001] = 0
+        self.assertEqual(BST.root.subtree_size, 5001)
+
+        self.assertRaises(ValueError, BinarySearchTree.from_sorted, [(2, 'b'), (1, 'a')])
+        self.assertRaises(ValueError, BinarySearchTree.from_unsorted, [(1, 'a'), (1, 'b')])
+        self.assertTrue(BinarySearchTree.from_sorted([]).is_empty())
+        # the cycle collector is left as it was found
+        self.assertTrue(gc.isenabled())
+        gc.disable()
+        try:
+            BinarySearchTree.from_sorted([(1, 'a')])
+            self.assertFalse(gc.isenabled())
+        finally:
+            gc.enable()
+
+    @timeout()
+    @number("1.9")
+    def test_slotted_nodes(self):
+        node = TreeNode(3, item='c')
+        self.assertFalse(hasattr(node, '__dict__'))
+        self.assertRaises(AttributeError, setattr, node, 'colour', 'red')
+        node.set_subtree_size(4)
+        self.assertEqual(str(node), "(3, 'c', [4])")
+        BST = BinarySearchTree()
+        for key in (2, 1, 3):
+            BST[key] = str(key)
+        self.assertEqual(str(BST.root), "(2, '2', [3])")
@@ -0,0 +1,70 @@
+import random
+import unittest
+from ed_utils.decorators import number, visibility
+from ed_utils.timeout import timeout
+
+from heap import MaxHeap, IndexedMaxHeap
+
+class TestMaxHeap(unittest.TestCase):
+
+    @timeout()
+    @number("6.1")
+    def test_heapify(self):
+        random.seed(81723)
+        items = [random.randint(0, 100) for _ in range(500)]
+        heap = MaxHeap.heapify(items)
+        self.assertEqual(len(heap), 500)
+        self.assertTrue(heap.is_full())
+        self.assertEqual([heap.get_max() for _ in range(500)], sorted(items, reverse=True))
+
+        heap = MaxHeap.heapify([3, 1, 2], max_size=10)
+        self.assertFalse(heap.is_full())
+        heap.add(7)
+        self.assertEqual(heap.get_max(), 7)
+
+        self.assertEqual(len(MaxHeap.heapify([])), 0)
+
+    @timeout()
+    @number("6.2")
+    def test_growable(self):
+        heap = MaxHeap(1, growable=True, shrink=True)
+        for i in range(1000):
+            self.assertFalse(heap.is_full())
+            heap.add(i)
+        self.assertEqual(len(heap), 1000)
+        self.assertLess(len(heap.the_array), 2 * 1000 + 1)
+        for i in reversed(range(1000)):
+            self.assertEqual(heap.get_max(), i)
+        self.assertLessEqual(len(heap.the_array), 1 + 2 * MaxHeap.MIN_CAPACITY)
+
+        bounded = MaxHeap(2)
+        bounded.add(1)
+        bounded.add(2)
+        self.assertTrue(bounded.is_full())
+        self.assertRaises(IndexError, bounded.add, 3)
+        self.assertRaises(ValueError, MaxHeap, 8, shrink=True)
+
+    @timeout()
+    @number("6.3")
+    def test_indexed(self):
+        random.seed(2291)
+        heap = IndexedMaxHeap(0, growable=True, shrink=True)
+        keys = {}
+        for _ in range(300):
+            key = random.randint(0, 1000)
+            keys[heap.add(key)] = key
+        for handle in random.sample(sorted(keys), 100):
+            keys[handle] += random.randint(0, 50)
+            heap.increase_key(handle, keys[handle])
+        for handle in random.sample(sorted(keys), 100):
+            keys[handle] -= random.randint(0, 50)
+            heap.decrease_key(handle, keys[handle])
+        for handle in random.sample(sorted(keys), 100):
+            self.assertEqual(heap.remove(handle), keys.pop(handle))
+        self.assertRaises(ValueError, heap.increase_key, next(iter(keys)), -1)
+        self.assertEqual(len(heap), 200)
+        while len(heap) > 0:
+            largest = max(keys.values())
+            self.assertEqual(keys.pop(heap.max_handle()), largest)
+            self.assertEqual(heap.get_max(), largest)
+        self.assertEqual(heap.position, {})
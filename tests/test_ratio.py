@@ -1,9 +1,11 @@
+import bisect
 import random
 import unittest
+from math import ceil
 from ed_utils.decorators import number, visibility
 from ed_utils.timeout import timeout
 
-from ratio import Percentiles
+from ratio import Percentiles, TreePercentiles, ApproximatePercentiles
 
 class RatioTest(unittest.TestCase):
 
@@ -39,4 +41,109 @@ class RatioTest(unittest.TestCase):
 
         p.remove_point(82)
         res = p.ratio(13, 10)
-        self.assertSetEqual(set(res), {14, 15, 16, 87, 91})
\ No newline at end of file
+        self.assertSetEqual(set(res), {14, 15, 16, 87, 91})
+
+    @timeout()
+    @number("2.3")
+    def test_many_ratios(self):
+        random.seed(5583)
+        p = Percentiles()
+        points = random.sample(range(10 ** 6), 2000)
+        for point in points:
+            p.add_point(point)
+        for point in points[:500]:
+            p.remove_point(point)
+        remaining = sorted(points[500:])
+        n = len(remaining)
+        for _ in range(300):
+            x, y = random.randint(0, 100), random.randint(0, 100)
+            lowest, highest = -(-n * x // 100), -(-n * y // 100)
+            self.assertEqual(p.cut_points(x, y), (lowest, n - highest))
+            self.assertEqual(p.ratio(x, y), remaining[lowest:n - highest])
+        self.assertEqual(Percentiles().ratio(10, 10), [])
+
+    @timeout()
+    @number("2.4")
+    def test_tree_percentiles(self):
+        random.seed(7720)
+        p, t = Percentiles(), TreePercentiles()
+        for _ in range(3000):
+            point = random.randint(0, 200)  # plenty of equal points
+            if random.random() < 0.3:
+                p.remove_point(point)
+                t.remove_point(point)
+            else:
+                p.add_point(point)
+                t.add_point(point)
+        self.assertEqual(len(t), len(p))
+        for k in (1, len(p) // 2, len(p)):
+            self.assertEqual(t.select(k), p.select(k))
+        for point in (-1, 0, 100, 201):
+            self.assertEqual(t.rank(point), p.rank(point))
+        for _ in range(300):
+            x, y = random.randint(0, 100), random.randint(0, 100)
+            self.assertEqual(t.ratio(x, y), p.ratio(x, y))
+        self.assertEqual(TreePercentiles().ratio(10, 10), [])
+        self.assertNotIsInstance(t, Percentiles)
+        self.assertEqual(t.cut_points(13, 10), p.cut_points(13, 10))
+
+    @timeout()
+    @number("2.5")
+    def test_approximate_percentiles(self):
+        random.seed(1618)
+        n, k = 20000, 200
+        points = [random.random() for _ in range(n)]
+        exact = sorted(points)
+        whole = ApproximatePercentiles(k, seed=1)
+        halves = ApproximatePercentiles(k, seed=2), ApproximatePercentiles(k, seed=3)
+        for i, point in enumerate(points):
+            whole.add_point(point)
+            halves[i % 2].add_point(point)
+        merged = halves[0]
+        merged.merge(halves[1])
+        for sketch in (whole, merged):
+            self.assertEqual(len(sketch), n)
+            self.assertLess(sketch.retained(), 3 * k + 50)
+            for p in range(0, 101, 5):
+                estimate = sketch.percentile(p)
+                self.assertLessEqual(abs(bisect.bisect_left(exact, estimate) - (max(1, ceil(n * p / 100)) - 1)), 2 * n / k)
+            res = sketch.ratio(10, 20)
+            self.assertEqual(res, sorted(res))
+            self.assertLessEqual(abs(bisect.bisect_left(exact, res[0]) - n // 10), 2 * n / k)
+            self.assertLessEqual(abs(bisect.bisect_left(exact, res[-1]) - n * 8 // 10), 2 * n / k)
+        self.assertNotIsInstance(whole, Percentiles)
+        self.assertFalse(hasattr(whole, 'remove_point'))
+        self.assertRaises(ValueError, whole.quantile, 1.5)
+        self.assertEqual(ApproximatePercentiles().ratio(10, 10), [])
+
+    @timeout()
+    @number("2.6")
+    def test_batches(self):
+        random.seed(3141)
+
+        class Array(list):
+            """ Stands in for a NumPy array, which is converted with tolist. """
+            def tolist(self):
+                return list(self)
+
+        for percentiles_type in (Percentiles, TreePercentiles):
+            p, batched = Percentiles(), percentiles_type()
+            for size in (0, 1, 500, 20, 2000, 3):
+                batch = [random.randint(0, 300) for _ in range(size)]  # with equal points
+                for point in batch:
+                    p.add_point(point)
+                batched.add_points(Array(batch))
+                self.assertEqual(batched.ratio(0, 0), p.points)
+                removed = random.sample(p.points, len(p.points) // 3) + [-1, 301]
+                for point in removed:
+                    p.remove_point(point)
+                batched.remove_points(removed)
+                self.assertEqual(batched.ratio(0, 0), p.points)
+                self.assertEqual(len(batched), len(p))
+
+        sketch = ApproximatePercentiles(seed=4)
+        points = [random.random() for _ in range(20000)]
+        sketch.add_points(Array(points[:15000]))
+        sketch.add_points(points[15000:])
+        self.assertEqual(len(sketch), 20000)
+        self.assertLessEqual(abs(bisect.bisect_left(sorted(points), sketch.percentile(50)) - 10000), 200)
@@ -1,9 +1,16 @@
+import math
+import random
 import unittest
+from unittest import mock
 from ed_utils.decorators import number, visibility
 from ed_utils.timeout import timeout
 
 from threedeebeetree import ThreeDeeBeeTree
 
+class AlwaysParallelTree(ThreeDeeBeeTree):
+    """ Builds even small trees in parallel. Defined here so that worker processes can unpickle it. """
+    MIN_PARALLEL = 0
+
 class TestThreeDeeBeeTree(unittest.TestCase):
 
     TESTING_POINTS = [
@@ -64,3 +71,280 @@ class TestThreeDeeBeeTree(unittest.TestCase):
         
         self.assertEqual(tdbt.get_tree_node_by_key((16, 0, -14)).item, 7)
         self.assertEqual(tdbt.get_tree_node_by_key((6, -1, -17)).item, 0)
+
+    @timeout()
+    @number("3.4")
+    def test_box_queries(self):
+        random.seed(77120)
+        tdbt = ThreeDeeBeeTree()
+        points = {}
+        for i in range(2000):
+            point = tuple(random.randint(-50, 50) for _ in range(3))
+            tdbt[point] = i
+            points[point] = i
+        self.assertEqual(len(tdbt), len(points))
+        self.assertEqual(tdbt.root.subtree_size, len(points))
+
+        for _ in range(50):
+            lo = tuple(random.randint(-60, 50) for _ in range(3))
+            hi = tuple(c + random.randint(0, 60) for c in lo)
+            expected = {p: i for p, i in points.items() if all(l <= c <= u for l, c, u in zip(lo, p, hi))}
+            self.assertEqual(dict(tdbt.items_in_box(lo, hi)), expected)
+            self.assertEqual(tdbt.count_in_box(lo, hi), len(expected))
+        self.assertEqual(tdbt.count_in_box((-50, -50, -50), (50, 50, 50)), len(points))
+        self.assertEqual(list(ThreeDeeBeeTree().items_in_box((0, 0, 0), (1, 1, 1))), [])
+
+    @timeout()
+    @number("3.5")
+    def test_nearest(self):
+        random.seed(66231)
+        tdbt = ThreeDeeBeeTree()
+        points = list({tuple(random.randint(-100, 100) for _ in range(3)) for _ in range(1500)})
+        for i, point in enumerate(points):
+            tdbt[point] = i
+        distances = {
+            "euclidean": lambda p, q: sum((a - b) ** 2 for a, b in zip(p, q)),
+            "manhattan": lambda p, q: sum(abs(a - b) for a, b in zip(p, q)),
+        }
+        for metric, distance in distances.items():
+            for k in (1, 5, 30):
+                query = tuple(random.randint(-120, 120) for _ in range(3))
+                result = tdbt.nearest(query, k, metric)
+                expected = sorted(distance(query, p) for p in points)[:k]
+                self.assertEqual([distance(query, key) for key, _ in result], expected)
+                for key, item in result:
+                    self.assertEqual(tdbt[key], item)
+        self.assertEqual(len(tdbt.nearest((0, 0, 0), 2000)), len(points))
+        self.assertEqual(ThreeDeeBeeTree().nearest((0, 0, 0)), [])
+
+    @timeout()
+    @number("3.6")
+    def test_from_points(self):
+        random.seed(12093)
+        points = [tuple(random.randint(-1000, 1000) for _ in range(3)) for _ in range(3000)]
+        tdbt = ThreeDeeBeeTree.from_points(points, range(len(points)))
+        expected = {point: i for i, point in enumerate(points)}
+        self.assertEqual(len(tdbt), len(expected))
+        for point, i in expected.items():
+            self.assertEqual(tdbt[point], i)
+
+        def check(node):
+            sizes = [check(child) for child in filter(None, node.children)]
+            self.assertEqual(node.subtree_size, 1 + sum(size for size, _ in sizes))
+            return node.subtree_size, 1 + max((depth for _, depth in sizes), default=0)
+
+        size, depth = check(tdbt.root)
+        self.assertEqual(size, len(expected))
+        self.assertLessEqual(depth, 12)
+
+        line = ThreeDeeBeeTree.from_points([(i, i, i) for i in range(1000)])
+        self.assertLessEqual(check(line.root)[1], 12)
+        self.assertTrue(ThreeDeeBeeTree.from_points([]).is_empty())
+
+    @timeout()
+    @number("3.7")
+    def test_compact_nodes(self):
+        tdbt = ThreeDeeBeeTree()
+        tdbt[(0, 0, 0)] = 'root'
+        tdbt[(1, -1, 1)] = 'child'
+        root = tdbt.root
+        self.assertFalse(hasattr(root, '__dict__'))
+        self.assertEqual(len(root.children), 8)
+        self.assertIs(root.children[0b101], root.get_child_for_key((1, -1, 1)))
+        self.assertEqual([octant for octant, child in enumerate(root.children) if child is not None], [0b101])
+        leaf = root.children[0b101]
+        self.assertTrue(tdbt.is_leaf(leaf))
+        self.assertIsNone(leaf.get_child_for_key((0, 0, 0)))
+        self.assertFalse(tdbt.is_leaf(root))
+
+    @timeout()
+    @number("3.8")
+    def test_batches(self):
+        random.seed(40213)
+        points = [tuple(random.randint(-30, 30) for _ in range(3)) for _ in range(4000)]
+        one_by_one = ThreeDeeBeeTree()
+        for i, point in enumerate(points):
+            one_by_one[point] = i
+        batched = ThreeDeeBeeTree()
+        batched[points[0]] = -1
+        batched.insert_many(points[:1500], range(1500))
+        batched.insert_many(points[1500:], range(1500, 4000))
+        self.assertEqual(len(batched), len(one_by_one))
+        self.assertEqual(list(batched.keys_in_preorder()), list(one_by_one.keys_in_preorder()))
+
+        def sizes(node):
+            return [node.subtree_size] + [size for child in filter(None, node.children) for size in sizes(child)]
+
+        self.assertEqual(sizes(batched.root), sizes(one_by_one.root))
+        queries = random.sample(points, 1000)
+        self.assertEqual(batched.get_many(queries), [one_by_one[point] for point in queries])
+        self.assertRaises(KeyError, batched.get_many, queries + [(100, 100, 100)])
+        self.assertRaises(KeyError, ThreeDeeBeeTree().get_many, queries)
+        self.assertEqual(ThreeDeeBeeTree().get_many([]), [])
+
+        class Array:
+            """ Stands in for a NumPy array, whose tolist gives nested lists. """
+            def __init__(self, values):
+                self.values = values
+
+            def tolist(self):
+                return self.values
+
+        rows = Array([list(point) for point in points[:100]])
+        from_array = ThreeDeeBeeTree()
+        from_array.insert_many(rows, Array(list(range(100))))
+        last = {point: i for i, point in enumerate(points[:100])}
+        self.assertEqual(from_array.get_many(rows), [last[point] for point in points[:100]])
+
+    @timeout()
+    @number("3.9")
+    def test_delete(self):
+        random.seed(77031)
+        tdbt = ThreeDeeBeeTree()
+        expected = {}
+
+        def check(node):
+            live = sum(check(child) for child in filter(None, node.children)) + (not node.deleted)
+            self.assertEqual(node.subtree_size, live)
+            self.assertTrue(not node.deleted or any(node.children))
+            return live
+
+        for step in range(6000):
+            point = tuple(random.randint(-8, 8) for _ in range(3))
+            if point in expected and random.random() < 0.7:
+                del tdbt[point]
+                del expected[point]
+                self.assertNotIn(point, tdbt)
+            elif random.random() < 0.1:
+                batch = [tuple(random.randint(-8, 8) for _ in range(3)) for _ in range(100)]
+                tdbt.insert_many(batch, [step] * 100)
+                expected.update((key, step) for key in batch)
+            else:
+                tdbt[point] = step
+                expected[point] = step
+            if step % 500 == 0:
+                self.assertEqual(check(tdbt.root) if tdbt.root else 0, len(expected))
+                self.assertLessEqual(tdbt.tombstones, len(tdbt))
+        self.assertEqual(len(tdbt), len(expected))
+        self.assertEqual(sorted(tdbt.keys_in_preorder()), sorted(expected))
+        self.assertEqual(tdbt.get_many(list(expected)), list(expected.values()))
+
+        lo, hi = (-3, -8, 0), (5, 2, 8)
+        inside = {key: item for key, item in expected.items() if all(lo[a] <= key[a] <= hi[a] for a in range(3))}
+        self.assertEqual(dict(tdbt.items_in_box(lo, hi)), inside)
+        self.assertEqual(tdbt.count_in_box(lo, hi), len(inside))
+        query = (1, 2, 3)
+        distances = sorted(sum((a - b) ** 2 for a, b in zip(key, query)) for key in expected)
+        self.assertEqual([sum((a - b) ** 2 for a, b in zip(key, query)) for key, _ in tdbt.nearest(query, 10)],
+                         distances[:10])
+
+        for i, point in enumerate(list(expected)):
+            del tdbt[point]
+            self.assertLessEqual(tdbt.tombstones, len(tdbt))
+            if i == len(expected) // 2:
+                self.assertEqual(check(tdbt.root), len(tdbt))
+        self.assertGreater(tdbt.rebuilds, 0)
+        self.assertGreater(tdbt.rebuilt_nodes, 0)
+        self.assertTrue(tdbt.is_empty())
+        self.assertIsNone(tdbt.root)
+        self.assertRaises(KeyError, tdbt.__delitem__, (0, 0, 0))
+
+    @timeout()
+    @number("3.10")
+    def test_balance_ratio(self):
+        def worst(node):
+            """
+            Returns the worst ratio between the largest octant of a node, if it holds at least
+            19 points, and the rest of the node's points, and the depth.
+            """
+            if node is None:
+                return 1, 0
+            sizes = [0 if child is None else child.subtree_size for child in node.children] if node.children else [0] * 8
+            ratio = 1
+            largest, rest = max(sizes), node.subtree_size - (not node.deleted) - max(sizes)
+            if largest >= 19:
+                ratio = largest / rest if rest else float('inf')
+            below = [worst(child) for child in node.children if child is not None]
+            return max([ratio] + [r for r, _ in below]), 1 + max((d for _, d in below), default=0)
+
+        self.assertRaises(ValueError, ThreeDeeBeeTree, 5)
+        random.seed(5120)
+        line = ThreeDeeBeeTree(balance_ratio=7)
+        points = [(i, 2 * i, -i) for i in range(2000)] + [tuple(random.randint(0, 4000) for _ in range(3)) for _ in range(2000)]
+        for i, point in enumerate(points):
+            line[point] = i
+        expected = {point: i for i, point in enumerate(points)}
+        ratio, depth = worst(line.root)
+        self.assertLessEqual(ratio, 7)
+        self.assertLessEqual(depth, 25)
+        self.assertGreater(line.rebuilds, 0)
+        self.assertEqual(len(line), len(expected))
+        self.assertEqual(line.get_many(list(expected)), list(expected.values()))
+        self.assertEqual(line.root.subtree_size, len(expected))
+
+        for point in points[:1500]:
+            del line[point]
+            del expected[point]
+        line.insert_many([(i, i, i) for i in range(3000, 3500)])
+        expected.update(((i, i, i), None) for i in range(3000, 3500))
+        self.assertLessEqual(worst(line.root)[0], 7)
+        self.assertEqual(sorted(line.keys_in_preorder()), sorted(expected))
+        self.assertEqual(line.root.subtree_size, len(expected))
+
+        # Points sharing coordinates all go to the upper side of those axes, which no rebuild
+        # can change, so they must not keep the same nodes out of balance.
+        grid = [(x, y, z) for x in range(4) for y in range(30) for z in range(30)]
+        random.shuffle(grid)
+        for points in ([(0, 0, z) for z in range(3000)], grid):
+            tied = ThreeDeeBeeTree(balance_ratio=7)
+            for point in points:
+                tied[point] = None
+            ratio, depth = worst(tied.root)
+            self.assertLessEqual(ratio, 7)
+            self.assertLessEqual(depth, 30)
+            self.assertLessEqual(tied.rebuilt_nodes, len(points) * math.log2(len(points)))
+
+    @timeout()
+    @number("3.11")
+    def test_from_points_parallel(self):
+        random.seed(6619)
+        points = [tuple(random.randint(-500, 500) for _ in range(3)) for _ in range(5000)]
+        serial = ThreeDeeBeeTree.from_points(points, range(len(points)))
+        for levels in (1, 2):
+            parallel = AlwaysParallelTree.from_points_parallel(points, range(len(points)), workers=2, levels=levels)
+            self.assertIsInstance(parallel, AlwaysParallelTree)
+            self.assertEqual(len(parallel), len(serial))
+            self.assertEqual(list(parallel.keys_in_preorder()), list(serial.keys_in_preorder()))
+
+            def sizes(node):
+                return [node.subtree_size] + [size for child in filter(None, node.children) for size in sizes(child)]
+
+            self.assertEqual(sizes(parallel.root), sizes(serial.root))
+            self.assertEqual(parallel.get_many(points[-100:]), serial.get_many(points[-100:]))
+        self.assertEqual(list(ThreeDeeBeeTree.from_points_parallel(points[:50]).keys_in_preorder()),
+                         list(ThreeDeeBeeTree.from_points(points[:50]).keys_in_preorder()))
+        # a single worker, given or by default on a single CPU, is left to from_points
+        with mock.patch('threedeebeetree.ProcessPoolExecutor', side_effect=AssertionError), \
+                mock.patch('os.cpu_count', return_value=1):
+            for workers in (1, None):
+                single = AlwaysParallelTree.from_points_parallel(points, range(len(points)), workers=workers)
+                self.assertEqual(list(single.keys_in_preorder()), list(serial.keys_in_preorder()))
+
+    @timeout()
+    @number("3.12")
+    def test_from_points_with_ties(self):
+        def depth(node):
+            return 1 + max((depth(child) for child in filter(None, node.children)), default=0)
+
+        # The median of every subtree, in order of x, is its highest point on the other axes.
+        order = []
+        for value in range(3000):
+            order.insert((len(order) + 1) // 2, value)
+        random.seed(802)
+        for points in ([(0, 0, value) for value in order],
+                       [(0, value % 7, value) for value in order],
+                       [(0, random.randint(0, 50), value) for value in order],
+                       [(x, y, z) for x in range(4) for y in range(30) for z in range(30)]):
+            tdbt = ThreeDeeBeeTree.from_points(points)
+            self.assertEqual(sorted(tdbt.keys_in_preorder()), sorted(points))
+            self.assertLessEqual(depth(tdbt.root), 25)
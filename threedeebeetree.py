@@ -1,23 +1,70 @@
 from __future__ import annotations
-from typing import Generic, TypeVar, Tuple
-from dataclasses import dataclass, field
+from typing import Generic, TypeVar, Tuple, Iterator, Iterable
+from itertools import repeat
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from math import inf
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from heap import MaxHeap
+from utils import as_list, as_point_list, paused_gc
 
 I = TypeVar('I')
 Point = Tuple[int, int, int]
+INFINITE_REGION = ((-inf, -inf, -inf), (inf, inf, inf))
+# Cost of a difference along one axis; summed over the axes, these are increasing in the distance.
+AXIS_COSTS = {
+    "euclidean": lambda difference: difference * difference,
+    "manhattan": abs,
+}
+
+
+def octant_region(centre: Point, octant: int, lo: tuple, hi: tuple) -> tuple[tuple, tuple]:
+    """
+    Returns the region [lo, hi) covered by the given octant around centre, where
+    [lo, hi) is the region covered by the node at centre.
+    Points equal to the centre on an axis go to the upper half, as in get_child_for_key.
+    :complexity: O(1)
+    """
+    new_lo, new_hi = list(lo), list(hi)
+    for axis in range(3):
+        if octant & (1 << axis):
+            new_lo[axis] = centre[axis]
+        else:
+            new_hi[axis] = centre[axis]
+    return tuple(new_lo), tuple(new_hi)
+
+def build_encoded_subtree(tree_type: type, keys: list[Point], items: list) -> tuple[list, list, list, list]:
+    """
+    Builds a balanced subtree of distinct keys in a worker process for
+    ThreeDeeBeeTree.from_points_parallel, and returns it encoded by encode_subtree.
+    """
+    tree = tree_type()
+    return tree.encode_subtree(tree.build(keys, items))
+
 
-@dataclass
+@dataclass(slots=True)
 class BeeNode:
+    """
+    Node of a 3️⃣🇩🐝🌳 tree. Slotted, with the child in each octant (or None) in a list
+    of 8 indexed by octant. Leaves share the empty tuple instead, and get their list
+    with their first child, as most nodes of a tree are leaves.
+    A deleted node that still has children stays in the tree as a tombstone, to route
+    searches; subtree_size only counts the nodes that are not deleted.
+    """
 
     key: Point
     item: I
     subtree_size: int = 1
-    children: dict[int, BeeNode] = field(default_factory=dict)
+    children: list[BeeNode | None] | tuple = ()
+    deleted: bool = False
 
     def get_child_for_key(self, point: Point) -> BeeNode | None:
         """
         Constant time complexity of O(1) in both the best and worst cases.
 
-        Regardless of the size of the children dictionary or the values stored in it, the time complexity of this code remains constant.
+        The octant of the point indexes the list of children directly.
         """
         x, y, z = point
         octant = 0
@@ -27,19 +74,327 @@ class BeeNode:
             octant |= 2
         if z >= self.key[2]:
             octant |= 4
-        return self.children.get(octant)
+        return self.children[octant] if self.children else None
+
+    def set_child(self, octant: int, child: BeeNode | None) -> None:
+        """
+        Makes child the child of the node in the given octant.
+        :complexity: O(1)
+        """
+        if not self.children:
+            self.children = [None] * 8
+        self.children[octant] = child
 
 
 
 class ThreeDeeBeeTree(Generic[I]):
     """ 3️⃣🇩🐝🌳 tree. """
 
-    def __init__(self) -> None:
+    # Class of the nodes created on insertion; subclasses may use a BeeNode subclass.
+    node_type = BeeNode
+    # Subtrees of at most this many points are bulk loaded by plain insertion.
+    SMALL_SUBTREE = 16
+    # Number of points sampled to estimate ranks when bulk loading.
+    RANK_SAMPLE = 256
+    # Fewer points than this are not worth building in parallel.
+    MIN_PARALLEL = 10 ** 4
+    # With balancing on, a side of a node smaller than this is never out of balance,
+    # as in the 1:7 check of the tests.
+    MIN_UNBALANCED = 19
+
+    def __init__(self, balance_ratio: float | None = None) -> None:
         """
-            Initialises an empty 3DBT
+            Initialises an empty 3DBT.
+            If balance_ratio is given, a node is out of balance when, on some axis, the side of
+            its octants holding more points holds more than balance_ratio times as many as the
+            other and at least MIN_UNBALANCED. Insertions and deletions then rebuild the highest
+            such node on their path from a median split, as in a scapegoat tree. A rebuilt node
+            is never out of balance, so each rebuild of M nodes follows Omega(M) updates below it.
+            :raises ValueError: if balance_ratio is not above 5, the balance from_points guarantees
+            even when many points share coordinates
         """
+        if balance_ratio is not None and balance_ratio <= 5:
+            raise ValueError("balance_ratio must be above 5")
         self.root = None
         self.length = 0
+        self.balance_ratio = balance_ratio
+        # Deleted nodes kept as tombstones, and the rebuilds done to clear them or rebalance.
+        self.tombstones = 0
+        self.rebuilds = 0
+        self.rebuilt_nodes = 0
+
+    @classmethod
+    def from_points(cls, points: Iterable[Point], items: Iterable[I] | None = None) -> ThreeDeeBeeTree[I]:
+        """
+        Builds a balanced tree holding the given points, with the matching items if given.
+        Each node is the point whose coordinates are closest to the median on every axis
+        of the points in its subtree, so that no octant holds more than about 3/4 of them,
+        or 5/6 where many points share coordinates (see split).
+        Repeated points keep the last item, as with repeated insertion.
+        :complexity: O(N * log(N)) where N is the number of points, as every level of the
+        tree does O(N) work and there are O(log(N)) levels.
+        """
+        keyed = {}
+        for point, item in zip(points, repeat(None) if items is None else items):
+            keyed[tuple(point)] = item
+        tree = cls()
+        tree.root = tree.build(list(keyed), list(keyed.values()))
+        tree.length = len(keyed)
+        return tree
+
+    @classmethod
+    def from_points_parallel(cls, points: Iterable[Point], items: Iterable[I] | None = None,
+                             workers: int | None = None, levels: int = 1) -> ThreeDeeBeeTree[I]:
+        """
+        Builds the same balanced tree as from_points, sharing the work between up to workers
+        processes (by default, one per CPU). The top levels of the tree are split here, giving
+        up to 8 ** levels subtrees to the workers, which send them back in preorder as flat
+        lists to be linked in. Every top node knows the number of points below it when it is split, so
+        the subtree sizes come out right. Items must be picklable, and so must the tree's class.
+        Fewer than MIN_PARALLEL points, or a single worker, are simply built by from_points;
+        by default that is the case on a machine with a single CPU.
+
+        The speedup is well short of the number of workers. This process alone dedupes and
+        sorts all the points on x, splits the top levels, copies each subtree's points out
+        for its worker, and creates and links every node sent back, since the tree has to
+        live here. That serial part is about a third of the time from_points takes, which
+        caps the speedup near 2.5x however many workers there are, and makes it a slowdown
+        on a single CPU.
+        :complexity: O(N * log(N)) where N is the number of points, of which the split of the
+        top levels and the linking of the O(N) returned nodes are done by this process alone.
+        """
+        keyed = {}
+        for point, item in zip(points, repeat(None) if items is None else items):
+            keyed[tuple(point)] = item
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if len(keyed) < cls.MIN_PARALLEL or workers <= 1:
+            return cls.from_points(keyed, keyed.values())
+        tree = cls()
+        keys, items = list(keyed), list(keyed.values())
+        coordinates = [[key[axis] for key in keys] for axis in range(3)]
+
+        # Subtrees below the top levels, as (parent, octant, points sorted by x).
+        pending = []
+
+        def split_top(by_x: list[int], level: int) -> BeeNode:
+            splitter, children = tree.split(by_x, coordinates, keys)
+            node = tree.node_type(key=keys[splitter], item=items[splitter], subtree_size=len(by_x))
+            for octant, child_by_x in enumerate(children):
+                if not child_by_x:
+                    continue
+                if len(child_by_x) <= tree.SMALL_SUBTREE:
+                    node.set_child(octant, tree.build_small_subtree(child_by_x, coordinates, keys, items))
+                elif level + 1 < levels:
+                    node.set_child(octant, split_top(child_by_x, level + 1))
+                else:
+                    pending.append((node, octant, child_by_x))
+            return node
+
+        with paused_gc():
+            tree.root = split_top(sorted(range(len(keys)), key=coordinates[0].__getitem__), 0)
+            with ProcessPoolExecutor(workers) as pool:
+                futures = [pool.submit(build_encoded_subtree, cls, [keys[point] for point in by_x],
+                                       [items[point] for point in by_x]) for _, _, by_x in pending]
+                for (parent, octant, _), future in zip(pending, futures):
+                    parent.set_child(octant, tree.decode_subtree(*future.result()))
+        tree.annotate(tree.root)
+        tree.length = len(keys)
+        return tree
+
+    def encode_subtree(self, node: BeeNode) -> tuple[list[Point], list[I], list[int], list[int]]:
+        """
+        Lists the keys, items and subtree sizes of the subtree of node in preorder, visiting
+        children in increasing order of octant, with a mask of the octants holding a child
+        of each node. Flat lists pickle much faster than the nodes themselves.
+        :complexity: O(N) where N is the number of nodes in the subtree
+        """
+        keys, items, sizes, masks = [], [], [], []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            keys.append(current.key)
+            items.append(current.item)
+            sizes.append(current.subtree_size)
+            mask = 0
+            for octant, child in enumerate(current.children):
+                if child is not None:
+                    mask |= 1 << octant
+            masks.append(mask)
+            stack.extend(child for child in reversed(current.children) if child is not None)
+        return keys, items, sizes, masks
+
+    def decode_subtree(self, keys: list[Point], items: list[I], sizes: list[int], masks: list[int]) -> BeeNode:
+        """
+        Links the nodes of a subtree listed by encode_subtree, and returns its root.
+        The stack holds the nodes still missing children, with their octants in decreasing
+        order, so that the next node in preorder is the child at the end of the top one.
+        :complexity: O(N) where N is the number of nodes in the subtree
+        """
+        nodes = list(map(self.node_type, keys, items, sizes))
+        stack = []
+        for node, mask in zip(nodes, masks):
+            if stack:
+                parent, octants = stack[-1]
+                parent.children[octants.pop()] = node
+                if not octants:
+                    stack.pop()
+            if mask:
+                node.children = [None] * 8
+                stack.append((node, [octant for octant in range(7, -1, -1) if mask >> octant & 1]))
+        return nodes[0]
+
+    def build(self, keys: list[Point], items: list[I]) -> BeeNode | None:
+        """
+        Builds a balanced subtree holding the given distinct keys with their items, as in
+        from_points, and returns its root, or None if there are no keys. The new subtree is
+        passed to annotate.
+        :complexity: O(N * log(N)) where N is the number of keys
+        """
+        if not keys:
+            return None
+        coordinates = [[key[axis] for key in keys] for axis in range(3)]
+        by_x = sorted(range(len(keys)), key=coordinates[0].__getitem__)
+        with paused_gc():
+            root = self.build_subtree(by_x, coordinates, keys, items)
+        self.annotate(root)
+        return root
+
+    def annotate(self, node: BeeNode) -> None:
+        """
+        Called on the root of every subtree built from scratch, by from_points, rebuilds and
+        from_points_parallel, whose nodes only have their key, item and subtree size set.
+        Subclasses whose nodes hold more fields derived from their subtree fill them in here.
+        Does nothing by default.
+        :complexity: O(1)
+        """
+
+    def build_subtree(self, by_x: list[int], coordinates: list[list], keys: list[Point], items: list[I]) -> BeeNode:
+        """
+        Builds a balanced subtree. Points are referred to by their index in keys and items,
+        coordinates[axis][i] is the coordinate of point i on that axis, and by_x lists the
+        points of the subtree sorted along the x axis.
+        :pre: by_x is not empty
+        :complexity: O(N * log(N)) where N is the number of points.
+        """
+        if len(by_x) <= self.SMALL_SUBTREE:
+            return self.build_small_subtree(by_x, coordinates, keys, items)
+        splitter, children = self.split(by_x, coordinates, keys)
+        node = self.node_type(key=keys[splitter], item=items[splitter], subtree_size=len(by_x))
+        for octant, child_by_x in enumerate(children):
+            if child_by_x:
+                node.set_child(octant, self.build_subtree(child_by_x, coordinates, keys, items))
+        return node
+
+    def split(self, by_x: list[int], coordinates: list[list], keys: list[Point]) -> tuple[int, list[list[int]]]:
+        """
+        Picks the point to split the given points at, with arguments as for build_subtree, and
+        returns it with the points of each octant around it. The octants' lists are split off
+        in order, so they never need sorting again.
+
+        Ranks on the x axis are exact. Ranks on the y and z axes are estimated from an evenly
+        spaced sample of at least RANK_SAMPLE points, and are exact for small subtrees.
+        Only points whose x rank is within a quarter of the median are picked, so no octant
+        holds more than 3/4 of the points. When ties on x leave no such point, the splitter is
+        picked by median_splitter instead.
+        :pre: by_x is not empty
+        :complexity: O(N * log(N)) where N is the number of points.
+        """
+        size = len(by_x)
+        # The rank of a point on an axis is the number of points below it on that axis,
+        # that is, the size of the lower side when splitting there.
+        xs, ys, zs = coordinates
+        x_sorted = list(map(xs.__getitem__, by_x))
+        sample = by_x[::max(1, size // self.RANK_SAMPLE)]
+        y_sample, z_sample = sorted(map(ys.__getitem__, sample)), sorted(map(zs.__getitem__, sample))
+        scale = size / len(sample)
+
+        def imbalances(point: int) -> tuple[float, float, float]:
+            """ Twice the distance between the point's rank and the median, on each axis. """
+            return (abs(2 * bisect_left(x_sorted, xs[point]) - size),
+                    abs(2 * scale * bisect_left(y_sample, ys[point]) - size),
+                    abs(2 * scale * bisect_left(z_sample, zs[point]) - size))
+
+        # Search outwards from the median on the x axis. Ranks only grow going up and only
+        # shrink going down, so each search stops once its x imbalance alone is no better.
+        middle = size // 2
+        splitter, best = by_x[middle], max(imbalances(by_x[middle]))
+        if imbalances(splitter)[0] > size // 2:
+            # The median shares its x with so many points that its rank is far from the middle.
+            splitter = self.median_splitter(by_x, coordinates)
+        else:
+            for positions in (range(middle + 1, size), range(middle - 1, -1, -1)):
+                for position in positions:
+                    imbalance = imbalances(by_x[position])
+                    if imbalance[0] >= best or imbalance[0] > size // 2:
+                        break
+                    if max(imbalance) < best:
+                        splitter, best = by_x[position], max(imbalance)
+
+        x, y, z = keys[splitter]
+        children = [[] for _ in range(8)]
+        appends = [child.append for child in children]
+        for point in by_x:
+            appends[(xs[point] >= x) | (ys[point] >= y) << 1 | (zs[point] >= z) << 2](point)
+        # The splitter is in the upper octant on every axis.
+        children[7].remove(splitter)
+        return splitter, children
+
+    def median_splitter(self, by_x: list[int], coordinates: list[list]) -> int:
+        """
+        Picks the point to split the given points at when ties on x rule out the usual
+        search, with arguments as for build_subtree. On each axis, the candidates are the
+        first point sharing the median's coordinate and the first point above it, whose
+        exact ranks are the sizes of the lower side; the one closest to the middle wins.
+        Three tie groups holding more than 2/3 of the points each would share a point
+        between them twice, so some axis has a smaller one, and no octant holds more than
+        about 5/6 of the points.
+        :pre: by_x is not empty
+        :complexity: O(N * log(N)) where N is the number of points, to sort on y and z.
+        """
+        size = len(by_x)
+        best, splitter = size + 1, by_x[0]
+        for axis, values in enumerate(coordinates):
+            order = by_x if axis == 0 else sorted(by_x, key=values.__getitem__)
+            ranked = list(map(values.__getitem__, order))
+            median = ranked[size // 2]
+            for position in (bisect_left(ranked, median), bisect_right(ranked, median)):
+                if position < size and abs(2 * position - size) < best:
+                    best, splitter = abs(2 * position - size), order[position]
+        return splitter
+
+    def build_small_subtree(self, by_x: list[int], coordinates: list[list], keys: list[Point], items: list[I]) -> BeeNode:
+        """
+        Builds a subtree too small to get badly out of balance, splitting at the median
+        on the x axis only. Arguments are as for build_subtree.
+        :complexity: O(N^2) in the worst case, where N is the number of points, which is
+        at most SMALL_SUBTREE.
+        """
+        splitter = by_x[len(by_x) // 2]
+        x, y, z = keys[splitter]
+        xs, ys, zs = coordinates
+        node = self.node_type(key=keys[splitter], item=items[splitter], subtree_size=len(by_x))
+        children = {}
+        for point in by_x:
+            if point != splitter:
+                octant = (xs[point] >= x) | (ys[point] >= y) << 1 | (zs[point] >= z) << 2
+                children.setdefault(octant, []).append(point)
+        for octant, child_by_x in children.items():
+            node.set_child(octant, self.build_small_subtree(child_by_x, coordinates, keys, items))
+        return node
+
+    def keys_in_preorder(self) -> Iterator[Point]:
+        """
+        Yields every key, each before the keys in its subtree. Inserting the keys in
+        this order into an empty tree rebuilds the same tree, if it has no tombstones.
+        :complexity: O(N) where N is the number of nodes
+        """
+        stack = [] if self.root is None else [self.root]
+        while stack:
+            current = stack.pop()
+            if not current.deleted:
+                yield current.key
+            stack.extend(filter(None, current.children))
 
     def is_empty(self) -> bool:
         """
@@ -86,14 +441,36 @@ class ThreeDeeBeeTree(Generic[I]):
         current = self.root
         while current:
             if current.key == key:
+                if current.deleted:
+                    raise KeyError("Key not found")
                 return current
             child = current.get_child_for_key(key)
             if child is None:
                 raise KeyError("Key not found")
             current = child
 
+    def get_path_to_key(self, key: Point) -> list[BeeNode]:
+        """
+        Returns the nodes from the root down to the node with the given key.
+        :raises KeyError: if the key is not in the tree
+        :complexity: O(D) where D is the depth of the node
+        """
+        path = []
+        current = self.root
+        while current is not None:
+            path.append(current)
+            if current.key == key:
+                if current.deleted:
+                    break
+                return path
+            current = current.get_child_for_key(key)
+        raise KeyError("Key not found")
+
     def __setitem__(self, key: Point, item: I) -> None:
+        length = self.length
         self.root = self.insert_aux(self.root, key, item)
+        if self.balance_ratio is not None and self.length > length:
+            self.rebalance(self.get_path_to_key(key))
 
     def insert_aux(self, current: BeeNode, key: Point, item: I) -> BeeNode:
         """
@@ -115,11 +492,16 @@ class ThreeDeeBeeTree(Generic[I]):
         """
         if current is None:
             self.length += 1
-            return BeeNode(key=key, item=item)
+            return self.node_type(key=key, item=item)
 
         x,y,z = key
         if key == current.key:
             current.item = item
+            if current.deleted:  # bring the tombstone back to life as a new node
+                current.deleted = False
+                self.tombstones -= 1
+                current.subtree_size += 1
+                self.length += 1
         else:
             octant = 0
             if x >= current.key[0]:
@@ -128,26 +510,250 @@ class ThreeDeeBeeTree(Generic[I]):
                 octant |= 2
             if z >= current.key[2]:
                 octant |= 4
-            child = current.get_child_for_key(key)
+            child = current.children[octant] if current.children else None
+            length = self.length
             if child is None:
-                child = BeeNode(key=key, item=item)
-                current.children[octant] = child
+                child = self.node_type(key=key, item=item)
+                current.set_child(octant, child)
+                self.length += 1
             else:
                 self.insert_aux(child, key, item)
-            current.subtree_size += 1
+            # Only count the new node, if any: replacing an item leaves the sizes unchanged.
+            current.subtree_size += self.length - length
         return current
 
+    def __delitem__(self, key: Point) -> None:
+        """
+        Deletes the point with the given key. A leaf is unlinked from its parent, and so are
+        the tombstones left childless by that; any other node becomes a tombstone. Once the
+        tombstones outnumber the points, the whole tree is rebuilt without them, which keeps
+        the amortised cost of a deletion at O(log(N)) on top of the walk down.
+        :raises KeyError: if the key is not in the tree
+        :complexity: O(D) where D is the depth of the node, plus the occasional rebuild
+        """
+        path = self.get_path_to_key(key)
+        for node in path:
+            node.subtree_size -= 1
+        self.length -= 1
+        node = path.pop()
+        node.deleted = True
+        node.item = None
+        self.tombstones += 1
+        # Unlink the node, and the tombstones above it, for as long as they are leaves.
+        while node.deleted and not any(node.children):
+            self.tombstones -= 1
+            if not path:
+                self.root = None
+                return
+            parent = path.pop()
+            (x, y, z), (px, py, pz) = node.key, parent.key
+            parent.children[(x >= px) | (y >= py) << 1 | (z >= pz) << 2] = None
+            node = parent
+        if self.tombstones > self.length:
+            self.rebuild()
+        elif self.balance_ratio is not None:
+            path.append(node)
+            self.rebalance(path)
+
+    def rebuild(self) -> None:
+        """
+        Rebuilds the whole tree as from_points would, dropping every tombstone.
+        :complexity: O(N * log(N)) where N is the number of nodes
+        """
+        if self.root is not None:
+            self.root = self.rebuild_subtree(self.root)
+
+    def rebuild_subtree(self, node: BeeNode) -> BeeNode | None:
+        """
+        Rebuilds the subtree of node from median splits, dropping its tombstones, and returns
+        its new root, or None if it had no points left. Fields that subclasses of BeeNode add
+        are not carried over, but are filled in again by annotate.
+        :complexity: O(M * log(M)) where M is the number of nodes in the subtree
+        """
+        keys, items = [], []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.deleted:
+                self.tombstones -= 1
+            else:
+                keys.append(current.key)
+                items.append(current.item)
+            stack.extend(filter(None, current.children))
+        self.rebuilds += 1
+        self.rebuilt_nodes += len(keys)
+        return self.build(keys, items)
+
+    def is_unbalanced(self, node: BeeNode) -> bool:
+        """
+        Tells whether node is out of balance, as described in __init__. Only the largest
+        octant counts: a median split can always shrink it, whereas points sharing the
+        node's coordinate on an axis all stay on the upper side of that axis.
+        :complexity: O(1)
+        """
+        total = node.subtree_size - (not node.deleted)
+        if total < self.MIN_UNBALANCED:
+            return False
+        largest = max([child.subtree_size if child else 0 for child in node.children])
+        return largest >= self.MIN_UNBALANCED and largest > self.balance_ratio * (total - largest)
+
+    def rebalance(self, path: list[BeeNode]) -> None:
+        """
+        Rebuilds the subtree of the highest node of path that is out of balance, if any,
+        where path runs down from the root.
+        :complexity: O(D) where D is the length of path, plus O(M * log(M)) to rebuild a subtree
+        of M nodes, which is amortised over the Omega(M) updates it took to unbalance it.
+        """
+        for depth, node in enumerate(path):
+            if self.is_unbalanced(node):
+                rebuilt = self.rebuild_subtree(node)
+                if depth == 0:
+                    self.root = rebuilt
+                else:
+                    parent = path[depth - 1]
+                    (x, y, z), (px, py, pz) = node.key, parent.key
+                    parent.children[(x >= px) | (y >= py) << 1 | (z >= pz) << 2] = rebuilt
+                return
+
+    def insert_many(self, points: Iterable[Point], items: Iterable[I] | None = None) -> None:
+        """
+        Inserts the given points, with the matching items if given, one at a time through
+        __setitem__. points and items may also be arrays with a tolist method, such as an
+        (n, 3) NumPy array, which are converted in one call rather than element by element.
+        This is a convenience, not a faster path: to load many points into an empty tree,
+        from_points builds a balanced one.
+        :raises ValueError: if there are fewer items than points
+        :complexity: O(N * D) where N is the number of points and D the depth of the tree.
+        """
+        keys = as_point_list(points)
+        items = [item for item, _ in zip(repeat(None) if items is None else as_list(items), keys)]
+        if len(items) < len(keys):
+            raise ValueError("Fewer items than points")
+        for key, item in zip(keys, items):
+            self[key] = item
+
+    def get_many(self, points: Iterable[Point]) -> list[I]:
+        """
+        Returns the items of the given points, in order, looking each up in turn as
+        __getitem__ does. points may also be an array with a tolist method.
+        :raises KeyError: if any of the points is not in the tree
+        :complexity: O(N * D) where N is the number of points and D the depth of the tree.
+        """
+        get_tree_node_by_key = self.get_tree_node_by_key
+        return [get_tree_node_by_key(key).item for key in as_point_list(points)]
+
+    def items_in_box(self, lo: Point, hi: Point) -> Iterator[tuple[Point, I]]:
+        """
+        Yields the (key, item) pairs of all points in the box [lo, hi], bounds included.
+        An octant is only visited if the box reaches its side of the node on every axis,
+        using the same comparisons as get_child_for_key.
+        :complexity: O(N) in the worst case, where N is the number of nodes, but only the
+        octants meeting the box are visited.
+        """
+        stack = [] if self.root is None else [self.root]
+        while stack:
+            current = stack.pop()
+            x, y, z = current.key
+            if lo[0] <= x <= hi[0] and lo[1] <= y <= hi[1] and lo[2] <= z <= hi[2] and not current.deleted:
+                yield current.key, current.item
+            # sides[axis][1] tells whether the box reaches the upper (>=) side of the node on that axis.
+            sides = ((lo[0] < x, hi[0] >= x), (lo[1] < y, hi[1] >= y), (lo[2] < z, hi[2] >= z))
+            for octant, child in enumerate(current.children):
+                if child is not None and sides[0][octant & 1] and sides[1][(octant >> 1) & 1] and sides[2][(octant >> 2) & 1]:
+                    stack.append(child)
+
+    def count_in_box(self, lo: Point, hi: Point) -> int:
+        """
+        Returns the number of points in the box [lo, hi], bounds included.
+        Subtrees whose whole region lies inside the box are counted with their subtree_size.
+        :complexity: O(N) in the worst case, where N is the number of nodes, but subtrees
+        inside or outside the box are not descended into.
+        """
+        count = 0
+        stack = [] if self.root is None else [(self.root,) + INFINITE_REGION]
+        while stack:
+            current, region_lo, region_hi = stack.pop()
+            if all(lo[axis] <= region_lo[axis] and region_hi[axis] <= hi[axis] for axis in range(3)):
+                count += current.subtree_size
+                continue
+            if not current.deleted and all(lo[axis] <= current.key[axis] <= hi[axis] for axis in range(3)):
+                count += 1
+            for octant, child in enumerate(current.children):
+                if child is None:
+                    continue
+                child_lo, child_hi = octant_region(current.key, octant, region_lo, region_hi)
+                if all(child_lo[axis] <= hi[axis] and lo[axis] < child_hi[axis] for axis in range(3)):
+                    stack.append((child, child_lo, child_hi))
+        return count
+
+    def nearest(self, point: Point, k: int = 1, metric: str = "euclidean") -> list[tuple[Point, I]]:
+        """
+        Returns the (key, item) pairs of the k points closest to point, closest first,
+        with "euclidean" or "manhattan" distance.
+
+        Nodes are visited best-first by the distance from point to their region, which
+        builds up from the distances to the splitting planes of their ancestors, and the
+        k closest points found so far are kept in a bounded heap. The search stops once
+        no remaining region is closer than the k-th closest point.
+        :complexity: O(N * log(N)) in the worst case, where N is the number of nodes, and
+        about O(k + log(N)) visited nodes for well spread points in a balanced tree.
+        """
+        axis_cost = AXIS_COSTS[metric]
+        if self.root is None or k <= 0:
+            return []
+        closest = MaxHeap(min(k, len(self)))
+
+        def region_distance(lo: tuple, hi: tuple) -> float:
+            distance = 0
+            for axis in range(3):
+                if point[axis] < lo[axis]:
+                    distance += axis_cost(lo[axis] - point[axis])
+                elif point[axis] > hi[axis]:
+                    distance += axis_cost(point[axis] - hi[axis])
+            return distance
+
+        # Counters make heap entries unique, so that nodes are never compared.
+        visited = pushed = 0
+        frontier = MaxHeap(0, growable=True)
+        frontier.add((0, pushed, self.root) + INFINITE_REGION)
+        while len(frontier) > 0:
+            bound, _, current, lo, hi = frontier.get_max()
+            if closest.is_full() and -bound >= closest.peek_max()[0]:
+                break
+            distance = sum(axis_cost(current.key[axis] - point[axis]) for axis in range(3))
+            visited += 1
+            if current.deleted:  # a tombstone only routes the search to its children
+                pass
+            elif not closest.is_full():
+                closest.add((distance, visited, current))
+            elif distance < closest.peek_max()[0]:
+                closest.get_max()
+                closest.add((distance, visited, current))
+            for octant, child in enumerate(current.children):
+                if child is None:
+                    continue
+                child_lo, child_hi = octant_region(current.key, octant, lo, hi)
+                child_bound = region_distance(child_lo, child_hi)
+                if not closest.is_full() or child_bound < closest.peek_max()[0]:
+                    pushed += 1
+                    frontier.add((-child_bound, -pushed, child, child_lo, child_hi))
+
+        result = []
+        while len(closest) > 0:
+            _, _, node = closest.get_max()
+            result.append((node.key, node.item))
+        result.reverse()
+        return result
+
     def is_leaf(self, current: BeeNode) -> bool:
         """ Simple check whether or not the node is a leaf. """
         """
         The best-case complexity for this code is O(1) because it only requires a single operation to check if the current node has any children. 
         If the node has no children, the function immediately returns True.
 
-        The worst-case complexity for this code is O(N), where N is the number of children in the current node. 
-        In the worst case, the function needs to iterate through all the children of the node to determine if there are any. 
-        However, if the code implementation internally keeps track of the number of children or has a direct reference to the children list, the worst-case complexity can be reduced to O(1).
+        The worst-case complexity for this code is O(1) too: at most the 8 octants of the node are checked.
         """
-        return not current.children
+        return not any(current.children)
 
 if __name__ == "__main__":
     tdbt = ThreeDeeBeeTree()
@@ -0,0 +1,37 @@
+""" Helpers shared by the tree and percentile modules. """
+
+from __future__ import annotations
+
+__docformat__ = 'reStructuredText'
+
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+import gc
+
+
+def as_list(values: Iterable) -> list:
+    """ Returns the values as a list, converting arrays with a tolist method, such as NumPy arrays. """
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+def as_point_list(points: Iterable[tuple]) -> list[tuple]:
+    """ Returns the points as a list of tuples, which is how the trees keep them as keys. """
+    return list(map(tuple, as_list(points)))
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """
+        Disables the cycle collector for the duration of the block, and enables it again
+        afterwards if it was enabled before.
+        Bulk builds allocate many objects but no reference cycles, so the collector would
+        only keep rescanning the growing structure.
+        :complexity: O(1)
+    """
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()